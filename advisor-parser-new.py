@@ -1,15 +1,28 @@
-import concurrent.futures
-import csv
-import requests
-import yaml
+import asyncio
+import contextlib
 import json
-from bs4 import BeautifulSoup
 from datetime import datetime
-import re
 import argparse
+import hashlib
+import multiprocessing
 import os
-from openpyxl import load_workbook
-import xlrd  # for legacy .xls files
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import riskratios
+from categoryexport import CategorySpillWriter
+from asyncfetcher import AsyncFetcher, fetch_errors
+from concurrency import ConcurrencyController, parse_host_limits, parse_host_values
+from httpcache import ResponseCache
+import metrics
+import profiling
+from akparser import BACKENDS, DEFAULT_BACKEND, extract_nav_date, parse_fund_page_timed
+from fundstate import FundState
+from fundrecord import FundRecord
+from fundhistory import DEFAULT_DIR as DEFAULT_HISTORY_DIR, FundHistory
+from schememaster import DEFAULT_SCHEME_LIST, open_scheme_master
+from namematch import SIDECAR_SUFFIX as NAME_INDEX_SUFFIX, load_name_index, save_name_index
+from growwstats import GrowwStatsStore
 
 funds_with_no_data = []
 
@@ -19,6 +32,13 @@ MFT_AK_TO_AMFI = {}
 MFT_AK_LIST = []
 MFT_CATEGORIES = []
 RISK_METRICS_BY_MFTOOLS_KEY = {}
+# n-gram index over the risk report's scheme names, for mftools keys spelled differently
+RISK_NAME_INDEX = None
+RISK_NAME_INDEX_PATH = None
+PARSER_BACKEND = DEFAULT_BACKEND
+# One parser process per core; fetched pages queued beyond this many make the fetchers wait
+PARSE_WORKERS = os.cpu_count() or 1
+PARSE_QUEUE_SIZE = 64
 
 def load_mftools_mapping(json_path):
     try:
@@ -43,160 +63,176 @@ def load_mftools_mapping(json_path):
     except Exception as ex:
         print(f"Failed to load mftools mapping from {json_path}: {ex}")
 
+def resolve_missing_amfi_codes(scheme_list_path):
+    """Fill in AMFI codes the mapping lacks from the compiled scheme master, by exact scheme name."""
+    try:
+        master = open_scheme_master(scheme_list_path)
+    except Exception as ex:
+        print(f"Failed to open scheme master for {scheme_list_path}: {ex}")
+        return
+    resolved = 0
+    try:
+        for ak in MFT_AK_LIST:
+            if ak in MFT_AK_TO_AMFI:
+                continue
+            scheme = master.by_name(ak)
+            if scheme is not None:
+                MFT_AK_TO_AMFI[ak] = scheme["amfi_code"]
+                resolved += 1
+    finally:
+        master.close()
+    print(f"Resolved {resolved} AMFI codes from the scheme master")
+
+def read_risk_ratios(path):
+    """Parsed risk ratios and the name index over them, without installing them for enrichment."""
+    # Parsed table is reused from the sidecar next to the workbook while the workbook is unchanged
+    metrics = riskratios.load_risk_ratios(path)
+    return metrics, load_name_index(metrics, path + NAME_INDEX_SUFFIX)
+
+def install_risk_ratios(path, metrics, name_index):
+    global RISK_NAME_INDEX, RISK_NAME_INDEX_PATH
+    RISK_METRICS_BY_MFTOOLS_KEY.update(metrics)
+    RISK_NAME_INDEX_PATH = path + NAME_INDEX_SUFFIX
+    RISK_NAME_INDEX = name_index
+
 def load_risk_ratios(path):
     try:
-        ext = os.path.splitext(path)[1].lower()
-        required = ["Volatility", "Sharpe Ratio", "Beta", "Alpha", "Mean", "Sortino Ratio", "Up Market Capture\nRatio", "Down Market Capture\nRatio", "Maximum Drawdown", "R-Squared", "Information Ratio"]
-        if ext == ".xls":
-            if xlrd is None:
-                raise RuntimeError("xlrd is required to read .xls files. Install with 'pip install xlrd'.")
-            wb = xlrd.open_workbook(path)
-            sh = wb.sheet_by_index(0)
-            # autodetect header row by scanning first 200 rows for a row that contains expected header cues
-            header_row_idx = None
-            headers = []
-            for rr in range(min(sh.nrows, 200)):
-                row_vals = []
-                for cc in range(sh.ncols):
-                    val = sh.cell_value(rr, cc)
-                    row_vals.append(str(val).strip() if val is not None else "")
-                joined = " ".join(v.lower() for v in row_vals)
-                if "scheme name" in joined and "category" in joined:
-                    header_row_idx = rr
-                    headers = row_vals
-                    break
-            if header_row_idx is None:
-                header_row_idx = 0
-                headers = []
-                for c in range(sh.ncols):
-                    headers.append(str(sh.cell_value(0, c)).strip() if sh.cell_value(0, c) is not None else "")
-            # build fuzzy header index mapping
-            lower_headers = [h.lower() for h in headers]
-            h_idx = {}
-            for k in required:
-                lk = k.lower()
-                idx = None
-                for i, hv in enumerate(lower_headers):
-                    if lk in hv or hv in lk:
-                        idx = i
-                        break
-                if idx is not None:
-                    h_idx[k] = idx
-            # iterate rows after detected header
-            for r in range(header_row_idx + 1, sh.nrows):
-                key = sh.cell_value(r, 0)
-                if key in (None, ""):
-                    continue
-                key = str(key).strip()
-                metrics = {}
-                for k, idx in h_idx.items():
-                    if idx is not None and idx < sh.ncols:
-                        metrics[k] = sh.cell_value(r, idx)
-                if key:
-                    RISK_METRICS_BY_MFTOOLS_KEY[key] = metrics
-        else:
-            wb = load_workbook(filename=path, data_only=True, read_only=True)
-            ws = wb.active
-            # buffer first 200 rows to locate header row
-            buffered = []
-            it = ws.iter_rows(values_only=True)
-            for _ in range(200):
-                try:
-                    buffered.append(next(it))
-                except StopIteration:
-                    break
-            header_row = None
-            header_row_idx = None
-            for i, row in enumerate(buffered):
-                if not row:
-                    continue
-                joined = " ".join((str(v).strip().lower() if v is not None else "") for v in row)
-                if "volatility" in joined and "sharpe" in joined:
-                    header_row = row
-                    header_row_idx = i
-                    break
-            if header_row is None:
-                if buffered:
-                    header_row = buffered[0]
-                    header_row_idx = 0
-                else:
-                    header_row = []
-                    header_row_idx = 0
-            headers = [str(h).strip() if h is not None else "" for h in header_row]
-            lower_headers = [h.lower() for h in headers]
-            h_idx = {}
-            for k in required:
-                lk = k.lower()
-                idx = None
-                for i, hv in enumerate(lower_headers):
-                    if lk in hv or hv in lk:
-                        idx = i
-                        break
-                if idx is not None:
-                    h_idx[k] = idx
-            # process buffered rows after header
-            for r in buffered[header_row_idx + 1:]:
-                if not r:
-                    continue
-                key = r[0]
-                if key is None or str(key).strip() == "":
-                    continue
-                key = str(key).strip()
-                metrics = {}
-                for k, idx in h_idx.items():
-                    if idx is not None and idx < len(r):
-                        metrics[k] = r[idx]
-                if key:
-                    RISK_METRICS_BY_MFTOOLS_KEY[key] = metrics
-            # continue with the rest of rows from iterator
-            for r in it:
-                if not r:
-                    continue
-                key = r[0]
-                if key is None or str(key).strip() == "":
-                    continue
-                key = str(key).strip()
-                metrics = {}
-                for k, idx in h_idx.items():
-                    if idx is not None and idx < len(r):
-                        metrics[k] = r[idx]
-                if key:
-                    RISK_METRICS_BY_MFTOOLS_KEY[key] = metrics
+        install_risk_ratios(path, *read_risk_ratios(path))
     except Exception as ex:
         print(f"Failed to load risk ratios from {path}: {ex}")
 
+def risk_metrics_for(ak_name):
+    """The fund's row from the risk ratios report (by mftools key, else by fuzzy name), or None."""
+    mkey = MFT_AK_TO_KEY.get(ak_name)
+    if not (isinstance(mkey, str) and mkey):
+        return None
+    metrics = RISK_METRICS_BY_MFTOOLS_KEY.get(mkey)
+    if metrics is None and RISK_NAME_INDEX is not None:
+        match = RISK_NAME_INDEX.match(mkey)
+        if match is not None:
+            metrics = RISK_METRICS_BY_MFTOOLS_KEY.get(match[0])
+    return metrics
+
 def enrich_from_mftools(valueDict, ak_name):
     try:
-        mkey = MFT_AK_TO_KEY.get(ak_name)
-        if isinstance(mkey, str) and mkey:
-            metrics = RISK_METRICS_BY_MFTOOLS_KEY.get(mkey)
-            if metrics:
-                for k, v in metrics.items():
-                    if v is not None:
-                        valueDict[k] = v
+        metrics = risk_metrics_for(ak_name)
+        if metrics:
+            for k, v in metrics.items():
+                if v is not None:
+                    valueDict[k] = v
     except Exception as ex:
         print(f"Risk metrics enrichment failed for {ak_name}: {ex}")
 
-def get_stock_prices(tickers):
-    trendDetails = list()
-    futures = list()
-    symbols_no_data = []
+def enrich_records(records):
+    """Apply the installed risk ratios to records scraped before the report was available."""
+    for record in records:
+        try:
+            metrics = risk_metrics_for(record.fund)
+            if metrics:
+                record.update({k: v for k, v in metrics.items() if v is not None})
+        except Exception as ex:
+            print(f"Risk metrics enrichment failed for {record.fund}: {ex}")
+    return records
 
-    # Number of processes in the process pool
-    num_processes = 100  # You can adjust this based on your system resources
+def _parse_pool_context():
+    """
+    Start method for the parser pool. Forking while other threads run (the plus
+    graph's login browser and report download) can deadlock the child on a lock
+    one of them held, so workers then come from a clean forkserver process.
+    """
+    if threading.active_count() > 1 and "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return None
 
-    # Use ThreadPoolExecutor for I/O-bound web requests
-    with concurrent.futures.ThreadPoolExecutor(max_workers=min(16, len(tickers))) as executor:
-        for count, ticker in enumerate(tickers):
-            print(count + 1, ticker)
-            futures.append(executor.submit(get_stock_info, ticker))
+def get_stock_prices(tickers, controller=None, cache=None, state=None, groww=None, parse_workers=None, sink=None):
+    """
+    Scrape every fund into FundRecords. Records are returned as a list, or handed
+    to sink(record) as each one completes (and not retained) when a sink is given.
+    """
+    parse_workers = parse_workers or PARSE_WORKERS
+    # Parsing is CPU-bound, so it runs in worker processes while the event loop keeps the network busy
+    with ProcessPoolExecutor(max_workers=parse_workers, mp_context=_parse_pool_context()) as pool:
+        return asyncio.run(_get_stock_prices(tickers, controller, cache, state, groww, pool, parse_workers, sink))
 
-        for future in concurrent.futures.as_completed(futures):
-            has_data, value = future.result()
-            if has_data:
-                trendDetails.append(value)
+async def _get_stock_prices(tickers, controller, cache, state, groww, pool, parse_workers, sink=None):
+    trendDetails = list()
+    symbols_no_data = []
+    if groww is None:
+        groww = GrowwStatsStore(":memory:")
+
+    def collect(result):
+        has_data, value = result
+        if has_data:
+            # metrics are parsed to floats once here; the state store keeps the raw dict
+            record = FundRecord.from_dict(value)
+            if sink is not None:
+                sink(record)
             else:
-                symbols_no_data.append(value)
+                trendDetails.append(record)
+        else:
+            symbols_no_data.append(value)
+
+    # Fetched pages wait here for a parser; when it is full, fetchers stop pulling new funds
+    pages = asyncio.Queue(maxsize=PARSE_QUEUE_SIZE)
+    pending = iter(enumerate(tickers))
+    finishing = set()
+
+    def finished(sym0, task):
+        finishing.discard(task)
+        if task.cancelled():
+            return
+        ex = task.exception()
+        if ex is not None:
+            print(f"\033[91mFailed to finish {sym0}: {ex!r}\033[0m")
+            collect((False, sym0))
+        else:
+            collect(task.result())
+
+    # A single pooled session drives both advisorkhoj and Groww; concurrency adapts per host
+    async with AsyncFetcher(controller=controller, cache=cache) as fetcher:
+        # Groww stats for every mapped scheme load alongside the fund pages; finish_fund_record joins these fetches
+        prefetch = asyncio.ensure_future(groww.prefetch(fetcher, MFT_AK_TO_AMFI.values()))
+
+        async def fetch_worker():
+            for count, ticker in pending:
+                print(count + 1, ticker)
+                result, page = await fetch_fund_page(fetcher, ticker, state, groww)
+                if page is None:
+                    collect(result)
+                else:
+                    await pages.put(page)
+
+        async def parse_worker():
+            loop = asyncio.get_running_loop()
+            while True:
+                page = await pages.get()
+                if page is None:
+                    return
+                sym0, url, ak_response, previous, content_hash = page
+                try:
+                    valueDict, parse_seconds = await loop.run_in_executor(
+                        pool, parse_fund_page_timed, ak_response.body, PARSER_BACKEND, ak_response.charset
+                    )
+                    metrics.REGISTRY.observe_parse("advisorkhoj", parse_seconds)
+                except Exception as ex:
+                    print(f"\033[91mFailed to parse {url}: {ex}\033[0m")
+                    collect((False, sym0))
+                    continue
+                print("Finished parsing " + url)
+                task = asyncio.ensure_future(finish_fund_record(fetcher, page, valueDict, state, groww))
+                finishing.add(task)
+                task.add_done_callback(lambda task, sym0=sym0: finished(sym0, task))
+
+        io_workers = fetcher.controller.max_workers("www.advisorkhoj.com")
+        fetchers = [asyncio.ensure_future(fetch_worker()) for _ in range(io_workers)]
+        parsers = [asyncio.ensure_future(parse_worker()) for _ in range(parse_workers)]
+        await asyncio.gather(*fetchers)
+        for _ in parsers:
+            await pages.put(None)
+        await asyncio.gather(*parsers)
+        # records (or the failure) are collected as each task completes; this only waits for the rest
+        await asyncio.gather(*finishing)
+        await prefetch
 
     # Update the global funds_with_no_data
     global funds_with_no_data
@@ -204,220 +240,151 @@ def get_stock_prices(tickers):
 
     return trendDetails
 
-def get_stock_info(symbol):
+async def apply_groww_stats(fetcher, groww, valueDict):
+    """P/E and P/B from today's Groww snapshot, or the in-flight prefetch for the scheme."""
+    scheme_code = valueDict.get('Scheme Code')
+    if groww is not None and isinstance(scheme_code, str) and scheme_code.strip():
+        stats = await groww.fetch(fetcher, scheme_code)
+        if stats is not None:
+            valueDict['P/E Ratio'] = stats["pe"]
+            valueDict['P/B Ratio'] = stats["pb"]
+
+async def fetch_fund_page(fetcher, symbol, state=None, groww=None):
+    """
+    I/O stage. Returns (result, None) when the fund is settled without parsing,
+    or (None, page) with the raw page for the parser stage. Stored records
+    reused by incremental mode get today's Groww P/E and P/B.
+    """
     ak_base_url = "https://www.advisorkhoj.com/mutual-funds-research/"
-    # symbol can be of the form "DisplayName:slug". Extract both parts.
-    sym0 = symbol
-    sym1 = None
-    if ':' in symbol:
-        sym0, sym1 = symbol.split(':', 1)
+    # symbol can be of the form "DisplayName:slug". Only the display name is used.
+    sym0 = symbol.split(':', 1)[0]
     url = f"{ak_base_url}{sym0}"
 
-    ak_response = requests.get(url, headers={}, timeout=20)
-
-    if ak_response.status_code == 200:
-        valueDict = {}
-
-        cagr_mapping = {'scheme_inception_returns': 'CAGR Since Inception',
-                        'scheme_1yr_returns': '1 Year CAGR',
-                        'scheme_3yr_returns': '3 Years CAGR',
-                        'scheme_5yr_returns': '5 Years CAGR',
-                        'scheme_10yr_returns': '10 Years CAGR',
-                        'category_1yr_returns': '1 Year Category CAGR',
-                        'category_3yr_returns': '3 Years Category CAGR',
-                        'category_5yr_returns': '5 Years Category CAGR',
-                        'category_10yr_returns': '10 Years Category CAGR',
-                        'benchmark_1yr_returns': '1 Year Benchmark CAGR',
-                        'benchmark_3yr_returns': '3 Years Benchmark CAGR',
-                        'benchmark_5yr_returns': '5 Years Benchmark CAGR',
-                        'benchmark_10yr_returns': '10 Years Benchmark CAGR',
-                        'scheme_nav': 'NAV',
-                        'scheme_benchmark': 'Benchmark Type'}
-
-        ak_response_txt = ak_response.text
-        for key, index in cagr_mapping.items():
-            value = extract_using_regex(ak_response_txt, key)
-            if value:
-                valueDict[index] = value
-
-        soup = BeautifulSoup(ak_response_txt, 'html.parser')
-
-        # Fallback: extract NAV from DOM if not found via JS vars
-        if 'NAV' not in valueDict:
-            nav_label = soup.find('div', class_='nav-cagr-label')
-            if nav_label and 'NAV as on' in nav_label.get_text():
-                nav_value = nav_label.find_next('h4')
-                if nav_value:
-                    valueDict['NAV'] = nav_value.get_text(strip=True).replace('₹', '').replace(',', '')
-
-        context_mapping = {'Category: ': 'Category',
-                           'TER:': 'TER',
-                           'Total Assets:': 'Total Assets (in Cr)',
-                           'Launch Date:': 'Launch Date',
-                           'Turn over:': 'Turn over (%)',
-                           'Standard Deviation': 'Standard Deviation',
-                           'Alpha': 'Alpha',
-                           'Beta': 'Beta',
-                           'Sharpe Ratio': 'Sharpe Ratio'}
-
-        # retrieve market cap distributions
-        # mkt_cap_dist_types = ['Small Cap', 'Others', 'Large Cap', 'Mid Cap']
-        # for mkt_cap_div in soup.find_all('div', class_='flex-div'):
-        #     label_p = mkt_cap_div.find('p', class_='font12 text-left')
-        #     if not label_p:
-        #         continue
-        #     category = label_p.get_text(strip=True)
-        #     if category in mkt_cap_dist_types:
-        #         # the bar container has a style like "width:12.85%" and inner div with title="12.85%"
-        #         bar_container = mkt_cap_div.find('div', style=re.compile(r'width:\s*\d'))
-        #         if bar_container and bar_container.div and bar_container.div.has_attr('title'):
-        #             valueDict[category] = bar_container.div['title'].strip()
-
-        sch_over_table_keys = {'Category: ',
-                               'TER:',
-                               'Turn over:',
-                               'Total Assets:',
-                               'Launch Date:'}
-        tables = soup.find_all('table', class_='sch_over_table')
-        for index, table in enumerate(tables, start=1):
-            rows = table.find_all('tr')
-            for row in rows:
-                subrow = row.find('td').text.strip()
-                for key in sch_over_table_keys:
-                    if key in subrow:
-                        if key == 'TER:':
-                            valueDict[context_mapping[key]] = subrow.replace(key, '').strip().split(" As on ")[0]
-                        elif key == 'Total Assets:':
-                            valueDict[context_mapping[key]] = subrow.replace(key, '').strip().split(" Cr As on ")[0]
-                        elif key == 'Turn over:':
-                            result = subrow.replace(key, '').strip().split("|")[0]
-                            valueDict[context_mapping[key]] = result.strip() if result else result
-                        else:
-                            valueDict[context_mapping[key]] = subrow.replace(key, '').strip()
-
-        adv_table_keys = {'Standard Deviation', 'Sharpe Ratio', 'Alpha', 'Beta'}
-        tables = soup.find_all('table', class_='adv-table table table-striped')
-        for index, table in enumerate(tables, start=1):
-            rows = table.find_all('tr')
-            for row in rows:
-                subrow = row.find('td')
-                if subrow:
-                    cleanedsubrow = subrow.text.strip()
-                    for key in adv_table_keys:
-                        if key in cleanedsubrow:
-                            valueDict[context_mapping[key]] = row.find_next('td', {'class': 'text-center'}).text.strip()
-
-        print("Finished parsing " + url)
-
-        if bool(valueDict):
-            valueDict['Fund'] = sym0
-            # Enrich with mftools risk ratios if available before potential early return
-            enrich_from_mftools(valueDict, sym0)
-            # if sym1 is None:
-            #     return (True, valueDict)
-        else:
-            print(f"\033[91m{sym0} has no data\033[0m")
-            return (False, sym0)
-    else:
+    # Incremental mode: reuse the stored record while no newer NAV can have been published
+    previous = state.get(sym0) if state is not None else None
+    if previous is not None and state.is_current(previous):
+        state.skipped += 1
+        valueDict = previous["record"]
+        enrich_from_mftools(valueDict, sym0)
+        await apply_groww_stats(fetcher, groww, valueDict)
+        return (True, valueDict), None
+
+    try:
+        ak_response = await fetcher.get(url)
+    except fetch_errors() as ex:
+        print(f"\033[91mFailed for {url}: {ex}\033[0m")
+        return (False, sym0), None
+
+    if ak_response.status != 200:
         print(f"\033Failed for {url}\033[0m")
+        return (False, sym0), None
+
+    content_hash = None
+    if state is not None:
+        content_hash = hashlib.sha256(ak_response.body).hexdigest()
+        if previous is not None and previous["content_hash"] == content_hash:
+            state.unchanged += 1
+            valueDict = previous["record"]
+            enrich_from_mftools(valueDict, sym0)
+            await apply_groww_stats(fetcher, groww, valueDict)
+            state.put(sym0, previous["nav_date"], content_hash, valueDict)
+            return (True, valueDict), None
+
+    return None, (sym0, url, ak_response, previous, content_hash)
+
+async def finish_fund_record(fetcher, page, valueDict, state, groww):
+    """Enrichment stage for a parsed page: mftools risk metrics, Groww stats and the state store."""
+    sym0, url, ak_response, previous, content_hash = page
+    if not bool(valueDict):
+        print(f"\033[91m{sym0} has no data\033[0m")
         return (False, sym0)
 
+    valueDict['Fund'] = sym0
+    enrich_from_mftools(valueDict, sym0)
+
     # Resolve scheme code via amfiKey mapping from mftools JSON (no web search)
     scheme_code = MFT_AK_TO_AMFI.get(sym0)
     if isinstance(scheme_code, str) and scheme_code.strip():
         valueDict['Scheme Code'] = scheme_code.strip()
 
-    scheme_code = valueDict.get('Scheme Code')
-    if isinstance(scheme_code, str) and scheme_code.strip():
-        try:
-            groww_page_url = f"https://groww.in/v1/api/data/mf/web/v1/scheme/portfolio/{scheme_code}/stats"
-            gp_resp = requests.get(groww_page_url, timeout=20)
-            if gp_resp.status_code == 200:
-                data = json.loads(gp_resp.text)
-                valueDict['P/E Ratio'] = data.get("pe")
-                valueDict['P/B Ratio'] = data.get("pb")
-        except Exception:
-            # Do not fail overall parsing if Groww page structure changes
-            pass
+    await apply_groww_stats(fetcher, groww, valueDict)
 
     # Final enrichment with risk metrics (if not already applied)
     enrich_from_mftools(valueDict, sym0)
+
+    if state is not None:
+        state.updated += 1
+        state.put(sym0, extract_nav_date(ak_response.body, ak_response.charset), content_hash, valueDict)
     return (True, valueDict)
 
-def extract_using_regex(input_string, key):
-    # Match JS assignments like: var key = 'value'; or key="value"
-    pattern = rf"\b{re.escape(key)}\s*=\s*['\"]([^'\"]+)['\"]"
-    match = re.search(pattern, input_string)
-    if match:
-        return match.group(1).strip()
-    return None
+EXPORT_COLUMNS = ['Fund',
+                  'Category',
+                  'Scheme Code',
+                  'Launch Date',
+                  'Total Assets (in Cr)',
+                  'TER',
+                  'Turn over (%)',
+                  'CAGR Since Inception',
+                  '1 Year CAGR',
+                  '1 Year Category CAGR',
+                  '1 Year Benchmark CAGR',
+                  '3 Years CAGR',
+                  '3 Years Category CAGR',
+                  '3 Years Benchmark CAGR',
+                  '5 Years CAGR',
+                  '5 Years Category CAGR',
+                  '5 Years Benchmark CAGR',
+                  '10 Years CAGR',
+                  '10 Years Category CAGR',
+                  '10 Years Benchmark CAGR',
+                  'Benchmark Type',
+                  'NAV',
+                  'Alpha',
+                  'Beta',
+                  'Standard Deviation',
+                  'Sharpe Ratio',
+                  "Volatility",
+                  "Mean",
+                  "Sortino Ratio",
+                  "Up Market Capture\nRatio",
+                  "Down Market Capture\nRatio",
+                  "Maximum Drawdown",
+                  "R-Squared",
+                  "Information Ratio",
+                  'P/E Ratio',
+                  'P/B Ratio'
+                  ]
+
+def open_export(csv_file_path=None):
+    """Category-ordered CSV export that takes fund records as they complete."""
+    if csv_file_path is None:
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        csv_file_path = f"fund-stats_{timestamp}.csv"
+    return CategorySpillWriter(csv_file_path, EXPORT_COLUMNS, MFT_CATEGORIES or [])
+
+def open_history(history_dir):
+    """Appender adding this run to the fund history store; a no-op sink when history_dir is ''."""
+    if not history_dir:
+        return contextlib.nullcontext(_NoHistory())
+    return FundHistory(history_dir).appender()
+
+class _NoHistory:
+    rows = 0
+
+    def add(self, record):
+        pass
+
+    def close(self):
+        return 0
 
 def export_to_file(data):
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    csv_file_path = f"fund-stats_{timestamp}.csv"
-
-    column_order = ['Fund',
-                   'Category',
-                   'Scheme Code',
-                   'Launch Date',
-                   'Total Assets (in Cr)',
-                   'TER',
-                   'Turn over (%)',
-                   'CAGR Since Inception',
-                   '1 Year CAGR',
-                   '1 Year Category CAGR',
-                   '1 Year Benchmark CAGR',
-                   '3 Years CAGR',
-                   '3 Years Category CAGR',
-                   '3 Years Benchmark CAGR',
-                   '5 Years CAGR',
-                   '5 Years Category CAGR',
-                   '5 Years Benchmark CAGR',
-                   '10 Years CAGR',
-                   '10 Years Category CAGR',
-                   '10 Years Benchmark CAGR',
-                   'Benchmark Type',
-                   'NAV',
-                   'Alpha',
-                   'Beta',
-                   'Standard Deviation',
-                   'Sharpe Ratio',
-                   "Volatility",
-                   "Mean",
-                   "Sortino Ratio", 
-                   "Up Market Capture\nRatio", 
-                   "Down Market Capture\nRatio", 
-                   "Maximum Drawdown", 
-                   "R-Squared",
-                   "Information Ratio",
-                   'P/E Ratio',
-                   'P/B Ratio'
-                   ]
-
-    category_order = MFT_CATEGORIES or []
-
-    fundsByType = {}
-    for fund_data in data:
-        if 'Category' in fund_data:
-            category = fund_data.get('Category')
-            fundStats = []
-            if category in fundsByType:
-                fundStats = fundsByType.get(category)
-            fundStats.append([fund_data.get(column, '') for column in column_order])
-            fundsByType[category] = fundStats
-        else:
-            print("No category for fund " + str(fund_data) + " hence skipping.")
-
-    with open(csv_file_path, 'w', newline='') as csv_file:
-        writer = csv.writer(csv_file)
-        writer.writerow(column_order)
-
-        for category in category_order:
-            if category in fundsByType.keys():
-                writer.writerow([category])
-                writer.writerows(fundsByType[category])
+    with open_export() as exporter:
+        for fund_data in data:
+            exporter.add(fund_data)
 
 def extract_data_from_yaml(property):
+    import yaml
+
     with open('fundslist.yaml', 'r') as file:
         data = yaml.safe_load(file)
 
@@ -472,28 +439,97 @@ def export_funds_categories_json(records, categories, output_path='funds_and_cat
     with open(output_path, 'w') as f:
         json.dump(payload, f, indent=2)
 
-if __name__ == "__main__":
-    # parse arguments
-    parser = argparse.ArgumentParser(description="Advisor parser with risk ratios enrichment")
+def build_arg_parser(description="Advisor parser with risk ratios enrichment"):
+    parser = argparse.ArgumentParser(description=description)
     script_dir = os.path.dirname(os.path.abspath(__file__))
     default_mftools_json = os.path.join(script_dir, "funds_and_categories_with_mftools.json")
     default_riskratios = os.path.join(script_dir, "risk-ratios.xls")
+    default_cache_dir = os.path.join(script_dir, ".http-cache")
+    default_state_db = os.path.join(script_dir, "fund-state.sqlite3")
+    default_groww_store = os.path.join(script_dir, "groww-stats.sqlite3")
     parser.add_argument("--risk-ratios", default=default_riskratios, help="Path to risk ratios Excel (.xls or .xlsx)")
+    parser.add_argument("--scheme-list", default=DEFAULT_SCHEME_LIST, help="AMFI scheme list used to resolve codes missing from the mftools JSON")
     parser.add_argument("--mftools-json", default=default_mftools_json, help="Path to funds_and_categories_with_mftools.json (defaults to file alongside this script)")
-    args = parser.parse_args()
-
-    # load mappings
+    parser.add_argument("--host-limit", action="append", default=[], metavar="HOST=N", help="Ceiling for the adaptive concurrent request limit of a host, e.g. www.advisorkhoj.com=16 (repeatable)")
+    parser.add_argument("--host-rps", action="append", default=[], metavar="HOST=R", help="Requests-per-second ceiling for a host, e.g. groww.in=10 (repeatable)")
+    parser.add_argument("--cache-dir", default=default_cache_dir, help="Directory for the on-disk HTTP response cache")
+    parser.add_argument("--cache-max-mb", type=int, default=512, help="Size bound for cached response bodies (LRU eviction)")
+    parser.add_argument("--no-cache", action="store_true", help="Always download, bypassing the HTTP response cache")
+    parser.add_argument("--parser", choices=BACKENDS, default=DEFAULT_BACKEND, help="HTML parser backend for fund pages (lxml is faster, bs4 is the fallback)")
+    parser.add_argument("--incremental", action="store_true", help="Skip funds whose NAV cannot have changed since the last run and reuse their stored records")
+    parser.add_argument("--state-db", default=default_state_db, help="SQLite state store used by --incremental")
+    parser.add_argument("--parse-workers", type=int, default=PARSE_WORKERS, help="Parser processes (defaults to one per core)")
+    parser.add_argument("--groww-store", default=default_groww_store, help="SQLite daily snapshot of Groww P/E and P/B (each scheme is fetched at most once a day)")
+    parser.add_argument("--history-dir", default=DEFAULT_HISTORY_DIR, help="Append-only store every run's fund metrics are added to ('' to disable)")
+    parser.add_argument("--metrics-dir", default=metrics.DEFAULT_DIR, help="Directory for the run's JSON and Prometheus textfile metrics ('' to disable)")
+    profiling.add_profile_arguments(parser)
+    return parser
+
+def load_mappings(args):
+    """Fund list, mftools keys, categories and AMFI codes; returns the funds to scrape."""
+    global PARSER_BACKEND
+    PARSER_BACKEND = args.parser
     load_mftools_mapping(args.mftools_json)
-    load_risk_ratios(args.risk_ratios)
-
+    resolve_missing_amfi_codes(args.scheme_list)
     # extract fund names from JSON (akKey list)
-    funds = MFT_AK_LIST or []
+    return MFT_AK_LIST or []
 
-    # extract data for funds
-    extracted_data = get_stock_prices(funds)
+def scrape_funds(args, funds, sink=None):
+    """Scrape funds with the caches and stores args configures; see get_stock_prices for sink."""
+    cache = None if args.no_cache else ResponseCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024)
+    state = FundState(args.state_db) if args.incremental else None
+    groww = GrowwStatsStore(args.groww_store)
+    try:
+        controller = ConcurrencyController(parse_host_limits(args.host_limit), parse_host_values(args.host_rps, float))
+        records = get_stock_prices(funds, controller, cache, state, groww, args.parse_workers, sink=sink)
+    finally:
+        groww.close()
+        if state is not None:
+            state.close()
 
     # data_sorted_by_alpha = sorted(extracted_data, key=lambda x: (print(x) or float(x['Alpha'])) if x['Alpha'] and x['Alpha'] != '-' else float('-inf'), reverse=True)
     print(f"\033[91m{len(funds_with_no_data)} funds have no data. These are, {funds_with_no_data}.\033[0m")
+    if cache is not None:
+        print(cache.report())
+    if state is not None:
+        print(state.report())
+    print(groww.report())
+    print(controller.report())
+    return records
 
-    # export CSV file (existing behavior)
-    export_to_file(extracted_data)
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    stage = metrics.REGISTRY.stage
+
+    try:
+        with profiling.profile_run("scrape", args.profile, args.profile_alloc):
+            # load mappings
+            with stage("mappings"):
+                funds = load_mappings(args)
+            with stage("risk_ratios"):
+                load_risk_ratios(args.risk_ratios)
+
+            try:
+                # Rows are spilled to per-category segments while funds are still being scraped
+                with open_export() as exporter, open_history(args.history_dir) as history:
+                    def sink(record):
+                        exporter.add(record)
+                        history.add(record)
+
+                    with stage("scrape"):
+                        scrape_funds(args, funds, sink=sink)
+                    with stage("export"):
+                        exporter.close()
+                        history.close()
+            finally:
+                if RISK_NAME_INDEX is not None:
+                    save_name_index(RISK_NAME_INDEX, RISK_NAME_INDEX_PATH)
+
+        print(f"Exported {exporter.rows_spilled} funds to {exporter.close()}")
+        if args.history_dir:
+            print(f"Appended {history.rows} funds to the history in {args.history_dir}")
+    finally:
+        metrics.REGISTRY.write_reports("scrape", args.metrics_dir)
+
+if __name__ == "__main__":
+    main()
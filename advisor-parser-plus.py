@@ -1,30 +1,91 @@
-import os
-import subprocess
-import sys
-
 import login
-from mftdownloader import download_report
+import metrics
+import profiling
+from mftdownloader import fetch_report, open_session
+from stagegraph import Stage, StageGraph
+from stockscraper import load_script
+
+
+def export_unenriched(graph, export_stage):
+    """
+    After a failure elsewhere in the graph (login, download or risk), export the
+    funds the scrape stage finished rather than throwing the scrape away.
+    """
+    scrape = graph.stages["scrape"]
+    if scrape.result is None or graph.stages["export"].started is not None:
+        return
+    print(f"\033[91mExporting {len(scrape.result)} scraped funds without risk ratio enrichment\033[0m")
+    with metrics.REGISTRY.stage("export"):
+        export_stage(scrape.result)
+
+
+def main(argv=None):
+    apn = load_script("advisor-parser-new.py")
+    parser = apn.build_arg_parser(
+        description="Log in, download the risk ratios and scrape advisorkhoj as one in-process stage graph"
+    )
+    args = parser.parse_args(argv)
+
+    def login_stage():
+        # Reuse the stored session, or log in (visible browser for CAPTCHA) if it expired
+        jsessionid, session_cookie = login.get_session(headless=False, slow_mo=400)
+        if not jsessionid:
+            raise SystemExit("Failed to acquire JSESSIONID (login may have failed). Aborting.")
+        return jsessionid, session_cookie
+
+    def download_stage(login):
+        with open_session(*login) as session:
+            saved, changed = fetch_report(session, "risk-ratios", args.risk_ratios)
+        if changed:
+            print(f"✅ Risk ratios downloaded to: {saved}")
+        else:
+            # same bytes as last time: the file keeps its mtime, so the risk-ratio cache is reused
+            print(f"✅ Risk ratios unchanged since the last download: {saved}")
+        return saved
+
+    def risk_stage(download):
+        return download, *apn.read_risk_ratios(download)
 
+    # The fund pages don't need the workbook; only the enrich join below does
+    def scrape_stage(mapping):
+        return apn.scrape_funds(args, mapping)
 
-def main():
-    # 1) Perform login flow to retrieve cookies (visible browser for CAPTCHA)
-    jsessionid, session_cookie = login.get_jsessionid(headless=False, slow_mo=400)
-    if not jsessionid:
-        raise SystemExit("Failed to acquire JSESSIONID (login may have failed). Aborting.")
+    def enrich_stage(risk, scrape):
+        apn.install_risk_ratios(*risk)
+        try:
+            return apn.enrich_records(scrape)
+        finally:
+            apn.save_name_index(apn.RISK_NAME_INDEX, apn.RISK_NAME_INDEX_PATH)
 
-    # 2) Download the Risk Ratios XLS to ./risk-ratios.xls
-    out_path = os.path.join(os.getcwd(), "risk-ratios.xls")
-    saved = download_report("risk-ratios", jsessionid, session_cookie, out_path)
-    print(f"✅ Risk ratios downloaded to: {saved}")
+    def export_stage(enrich):
+        with apn.open_export() as exporter, apn.open_history(args.history_dir) as history:
+            for record in enrich:
+                exporter.add(record)
+                history.add(record)
+        print(f"Exported {exporter.rows_spilled} funds to {exporter.close()}")
+        if args.history_dir:
+            print(f"Appended {history.rows} funds to the history in {args.history_dir}")
+        return exporter.path
 
-    # 3) Invoke advisor-parser-new with the downloaded risk-ratios path
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    apn_path = os.path.join(script_dir, "advisor-parser-new.py")
+    graph = StageGraph([
+        Stage("login", login_stage),
+        Stage("download", download_stage, ("login",)),
+        Stage("risk", risk_stage, ("download",)),
+        Stage("mapping", lambda: apn.load_mappings(args)),
+        Stage("scrape", scrape_stage, ("mapping",)),
+        Stage("enrich", enrich_stage, ("risk", "scrape")),
+        Stage("export", export_stage, ("enrich",)),
+    ])
     try:
-        subprocess.run([sys.executable, apn_path, "--risk-ratios", saved], check=True)
-        print("✅ advisor-parser-new completed")
-    except subprocess.CalledProcessError as e:
-        print(f"⚠️ advisor-parser-new failed with code {e.returncode}")
+        with profiling.profile_run("pipeline", args.profile, args.profile_alloc):
+            try:
+                graph.run()
+            except BaseException:
+                export_unenriched(graph, export_stage)
+                raise
+    finally:
+        print(graph.report())
+        metrics.REGISTRY.write_reports("pipeline", args.metrics_dir)
 
 
 if __name__ == "__main__":
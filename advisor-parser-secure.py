@@ -1,14 +1,20 @@
 import argparse
-import concurrent.futures
 import json
 import os
 import re
 from typing import Any
 
-import requests
-import xlrd
-import xlwt
-from openpyxl import load_workbook
+import metrics
+import profiling
+from concurrency import ConcurrencyController
+from growwstats import GrowwStatsStore
+from schememaster import DEFAULT_SCHEME_LIST, open_scheme_master
+from namematch import SIDECAR_SUFFIX as NAME_INDEX_SUFFIX, load_name_index, save_name_index
+from tablewriter import FORMATS, default_output_path, open_table_writer
+
+
+# Adaptive per-host limits for the Groww prefetch
+CONTROLLER = ConcurrencyController()
 
 
 def normalize(value: Any) -> str:
@@ -20,10 +26,14 @@ def normalize(value: Any) -> str:
 def load_rows(path: str) -> tuple[list[str], list[list[Any]]]:
     ext = os.path.splitext(path)[1].lower()
     if ext == ".xls":
+        import xlrd
+
         wb = xlrd.open_workbook(path)
         sh = wb.sheet_by_index(0)
         rows = [[sh.cell_value(r, c) for c in range(sh.ncols)] for r in range(sh.nrows)]
     else:
+        from openpyxl import load_workbook
+
         wb = load_workbook(filename=path, data_only=True, read_only=True)
         ws = wb.active
         rows = [list(r) for r in ws.iter_rows(values_only=True)]
@@ -34,21 +44,8 @@ def load_rows(path: str) -> tuple[list[str], list[list[Any]]]:
     return headers, rows[1:]
 
 
-def write_xls(path: str, headers: list[str], rows: list[list[Any]]) -> str:
-    wb = xlwt.Workbook()
-    ws = wb.add_sheet("Augmented Returns")
-
-    for c, h in enumerate(headers):
-        ws.write(0, c, h)
-    for r, row in enumerate(rows, start=1):
-        for c, val in enumerate(row):
-            ws.write(r, c, val if val is not None else "")
-
-    wb.save(path)
-    return os.path.abspath(path)
-
-
-def build_alias_index(mapping_json_path: str) -> dict[str, dict[str, Any]]:
+def build_alias_index(mapping_json_path: str, names: list[str] | None = None) -> dict[str, dict[str, Any]]:
+    """Normalized alias -> fund record; the raw alias spellings are appended to names if given."""
     with open(mapping_json_path, "r") as f:
         payload = json.load(f)
 
@@ -60,16 +57,38 @@ def build_alias_index(mapping_json_path: str) -> dict[str, dict[str, Any]]:
         if isinstance(ak, str) and ak.strip():
             aliases.add(normalize(ak))
             aliases.add(normalize(ak.replace("-", " ")))
+            if names is not None:
+                names.append(ak.replace("-", " "))
         if isinstance(mk, str) and mk.strip():
             aliases.add(normalize(mk))
+            if names is not None:
+                names.append(mk)
         for alias in aliases:
             if alias:
                 index[alias] = rec
     return index
 
 
-def extract_scheme_code(scheme_name: str, alias_index: dict[str, dict[str, Any]]) -> str | None:
-    rec = alias_index.get(normalize(scheme_name))
+def extract_scheme_code(
+    scheme_name: str,
+    alias_index: dict[str, dict[str, Any]],
+    name_index: Any = None,
+    scheme_master: Any = None,
+) -> str | None:
+    # exact alias first, then the AMFI name itself, then the closest alias
+    code = _amfi_code(alias_index.get(normalize(scheme_name)))
+    if code is None and scheme_master is not None:
+        scheme = scheme_master.by_name(scheme_name)
+        if scheme is not None:
+            code = scheme["amfi_code"]
+    if code is None and name_index is not None:
+        match = name_index.match(scheme_name)
+        if match is not None:
+            code = _amfi_code(alias_index.get(normalize(match[0])))
+    return code
+
+
+def _amfi_code(rec: dict[str, Any] | None) -> str | None:
     if not rec:
         return None
     amfi = rec.get("amfiKey")
@@ -81,20 +100,17 @@ def extract_scheme_code(scheme_name: str, alias_index: dict[str, dict[str, Any]]
     return code
 
 
-def fetch_groww_stats(scheme_code: str) -> tuple[Any, Any]:
-    url = f"https://groww.in/v1/api/data/mf/web/v1/scheme/portfolio/{scheme_code}/stats"
-    try:
-        resp = requests.get(url, timeout=20)
-        if resp.status_code != 200:
-            return "", ""
-        data = resp.json()
-        return data.get("pe", ""), data.get("pb", "")
-    except Exception:
-        return "", ""
-
-
-def augment_with_groww(input_path: str, mapping_json_path: str, output_path: str) -> str:
-    headers, rows = load_rows(input_path)
+def augment_with_groww(
+    input_path: str,
+    mapping_json_path: str,
+    output_path: str,
+    fmt: str | None = None,
+    store_path: str = "groww-stats.sqlite3",
+    scheme_list_path: str = DEFAULT_SCHEME_LIST,
+) -> str:
+    stage = metrics.REGISTRY.stage
+    with stage("load_input"):
+        headers, rows = load_rows(input_path)
     if not headers:
         raise RuntimeError(f"No rows found in input file: {input_path}")
 
@@ -106,47 +122,53 @@ def augment_with_groww(input_path: str, mapping_json_path: str, output_path: str
     if scheme_col < 0:
         raise RuntimeError("Could not find 'Scheme name' column in input file")
 
-    alias_index = build_alias_index(mapping_json_path)
-
-    # Resolve scheme code for each row.
-    scheme_codes: list[str | None] = []
-    for row in rows:
-        scheme_name = str(row[scheme_col] if scheme_col < len(row) else "").strip()
-        scheme_codes.append(extract_scheme_code(scheme_name, alias_index))
-
-    # Fetch Groww metrics concurrently.
-    results: list[tuple[Any, Any]] = [("", "") for _ in rows]
-    max_workers = min(16, max(1, len(rows)))
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_map = {}
-        for idx, code in enumerate(scheme_codes):
-            if code:
-                future_map[executor.submit(fetch_groww_stats, code)] = idx
-        for future in concurrent.futures.as_completed(future_map):
-            idx = future_map[future]
-            try:
-                results[idx] = future.result()
-            except Exception:
-                results[idx] = ("", "")
-
-    # Append columns.
+    with stage("resolve_codes"):
+        alias_names: list[str] = []
+        alias_index = build_alias_index(mapping_json_path, alias_names)
+        name_index_path = mapping_json_path + NAME_INDEX_SUFFIX
+        name_index = load_name_index(alias_names, name_index_path)
+
+        # Resolve scheme code for each row.
+        scheme_master = open_scheme_master(scheme_list_path)
+        scheme_codes: list[str | None] = []
+        try:
+            for row in rows:
+                scheme_name = str(row[scheme_col] if scheme_col < len(row) else "").strip()
+                scheme_codes.append(extract_scheme_code(scheme_name, alias_index, name_index, scheme_master))
+        finally:
+            scheme_master.close()
+        save_name_index(name_index, name_index_path)
+
+    # Today's snapshot answers known schemes; the rest are fetched once each, concurrently.
+    groww = GrowwStatsStore(store_path)
+    try:
+        with stage("groww"):
+            groww.prefetch_sync([code for code in scheme_codes if code], CONTROLLER)
+        results: list[tuple[Any, Any]] = []
+        for code in scheme_codes:
+            stats = groww.get(code) if code else None
+            results.append((stats["pe"], stats["pb"]) if stats else ("", ""))
+    finally:
+        groww.close()
+    print(groww.report())
+
+    # Append columns, streaming each row to the output as it is built.
     out_headers = headers + ["P/E Ratio", "P/B Ratio"]
-    out_rows: list[list[Any]] = []
-    for row, (pe, pb) in zip(rows, results):
-        out_rows.append(list(row) + [pe, pb])
-
-    return write_xls(output_path, out_headers, out_rows)
+    with stage("write"), open_table_writer(output_path, out_headers, "Augmented Returns", fmt) as writer:
+        for row, (pe, pb) in zip(rows, results):
+            writer.writerow(list(row) + [pe, pb])
+    return writer.close()
 
 
-def main() -> None:
+def main(argv: list[str] | None = None) -> None:
     parser = argparse.ArgumentParser(
         description="Augment consolidated MFT returns with Groww P/E and P/B ratios"
     )
     script_dir = os.path.dirname(os.path.abspath(__file__))
     parser.add_argument(
         "--input",
-        default=os.path.join(script_dir, "consolidated-mft-returns.xls"),
-        help="Path to consolidated-mft-returns.xls/.xlsx",
+        default=None,
+        help="Path to consolidated-mft-returns.xlsx/.xls (defaults to whichever is alongside this script, .xlsx first)",
     )
     parser.add_argument(
         "--mapping-json",
@@ -155,12 +177,45 @@ def main() -> None:
     )
     parser.add_argument(
         "--out",
-        default=os.path.join(script_dir, "consolidated-mft-returns-augmented.xls"),
-        help="Output XLS path",
+        default=None,
+        help="Output path (.xlsx, .csv or legacy .xls; default consolidated-mft-returns-augmented.xlsx alongside this script, or the --format extension)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default=None,
+        help="Output format (defaults to the --out extension)",
+    )
+    parser.add_argument(
+        "--scheme-list",
+        default=DEFAULT_SCHEME_LIST,
+        help="AMFI scheme list used to resolve codes the mapping lacks",
+    )
+    parser.add_argument(
+        "--groww-store",
+        default=os.path.join(script_dir, "groww-stats.sqlite3"),
+        help="SQLite daily snapshot of Groww P/E and P/B shared with advisor-parser-new.py",
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--metrics-dir",
+        default=metrics.DEFAULT_DIR,
+        help="Directory for the run's JSON and Prometheus textfile metrics ('' to disable)",
+    )
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.input is None:
+        candidates = [os.path.join(script_dir, f"consolidated-mft-returns.{ext}") for ext in ("xlsx", "xls")]
+        args.input = next((path for path in candidates if os.path.exists(path)), candidates[0])
+    if args.out is None:
+        args.out = default_output_path(script_dir, "consolidated-mft-returns-augmented", args.format)
 
-    saved = augment_with_groww(args.input, args.mapping_json, args.out)
+    try:
+        with profiling.profile_run("augment", args.profile, args.profile_alloc):
+            saved = augment_with_groww(
+                args.input, args.mapping_json, args.out, args.format, args.groww_store, args.scheme_list
+            )
+    finally:
+        metrics.REGISTRY.write_reports("augment", args.metrics_dir)
     print(f"✅ Augmented file saved to: {saved}")
 
 
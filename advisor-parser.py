@@ -9,18 +9,23 @@ from collections import defaultdict
 import threading
 import re
 
+from akparser import CAGR_MAPPING, extract_js_vars, normalize_encoding
+from concurrency import ConcurrencyController
+from fundrecord import FundRecord, sort_records
+
 funds_with_no_data = []
 
+# Adaptive per-host limits shared by every worker thread
+CONTROLLER = ConcurrencyController()
+
 def get_stock_prices(tickers):
     trendDetails = list()
     futures = list()
     symbols_no_data = []
 
-    # Number of processes in the process pool
-    num_processes = 100  # You can adjust this based on your system resources
-
-    # Use ThreadPoolExecutor for I/O-bound web requests
-    with concurrent.futures.ThreadPoolExecutor(max_workers=min(16, len(tickers))) as executor:
+    # Use ThreadPoolExecutor for I/O-bound web requests; CONTROLLER decides how many are in flight per host
+    max_workers = max(1, min(CONTROLLER.max_workers("www.advisorkhoj.com"), len(tickers)))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
         for count, ticker in enumerate(tickers):
             print(count + 1, ticker)
             futures.append(executor.submit(get_stock_info, ticker))
@@ -47,34 +52,22 @@ def get_stock_info(symbol):
         sym0, sym1 = symbol.split(':', 1)
     url = f"{ak_base_url}{sym0}"
 
-    ak_response = requests.get(url, headers={}, timeout=20)
+    with CONTROLLER.slot(url) as slot:
+        ak_response = requests.get(url, headers={}, timeout=20)
+        slot.status = ak_response.status_code
 
     if ak_response.status_code == 200:
         valueDict = {}
 
-        cagr_mapping = {'scheme_inception_returns': 'CAGR Since Inception',
-                        'scheme_1yr_returns': '1 Year CAGR',
-                        'scheme_3yr_returns': '3 Years CAGR',
-                        'scheme_5yr_returns': '5 Years CAGR',
-                        'scheme_10yr_returns': '10 Years CAGR',
-                        'category_1yr_returns': '1 Year Category CAGR',
-                        'category_3yr_returns': '3 Years Category CAGR',
-                        'category_5yr_returns': '5 Years Category CAGR',
-                        'category_10yr_returns': '10 Years Category CAGR',
-                        'benchmark_1yr_returns': '1 Year Benchmark CAGR',
-                        'benchmark_3yr_returns': '3 Years Benchmark CAGR',
-                        'benchmark_5yr_returns': '5 Years Benchmark CAGR',
-                        'benchmark_10yr_returns': '10 Years Benchmark CAGR',
-                        'scheme_nav': 'NAV',
-                        'scheme_benchmark': 'Benchmark Type'}
-
-        ak_response_txt = ak_response.text
-        for key, index in cagr_mapping.items():
-            value = extract_using_regex(ak_response_txt, key)
+        # the raw bytes are searched and parsed as they are; only matched values are decoded
+        encoding = normalize_encoding(ak_response.encoding)
+        js_vars = extract_js_vars(ak_response.content, encoding=encoding)
+        for key, index in CAGR_MAPPING.items():
+            value = js_vars.get(key)
             if value:
                 valueDict[index] = value
 
-        soup = BeautifulSoup(ak_response_txt, 'html.parser')
+        soup = BeautifulSoup(ak_response.content, 'html.parser', from_encoding=encoding)
 
         # Fallback: extract NAV from DOM if not found via JS vars
         if 'NAV' not in valueDict:
@@ -158,7 +151,9 @@ def get_stock_info(symbol):
     grow_url = f"{grow_base_url}{sym1}"
 
     try:
-        grow_response = requests.get(grow_url)
+        with CONTROLLER.slot(grow_url) as slot:
+            grow_response = requests.get(grow_url)
+            slot.status = grow_response.status_code
         if grow_response.status_code == 200:
             try:
                 data = json.loads(grow_response.text)
@@ -177,7 +172,9 @@ def get_stock_info(symbol):
     if sym1 and valueDict.get('Scheme Code') is not None:
         try:
             groww_page_url = f"https://groww.in/v1/api/data/mf/web/v1/scheme/portfolio/{valueDict['Scheme Code']}/stats"
-            gp_resp = requests.get(groww_page_url, timeout=20)
+            with CONTROLLER.slot(groww_page_url) as slot:
+                gp_resp = requests.get(groww_page_url, timeout=20)
+                slot.status = gp_resp.status_code
             if gp_resp.status_code == 200:
                 data = json.loads(gp_resp.text)
                 valueDict['P/E Ratio'] = data.get("pe")
@@ -188,14 +185,6 @@ def get_stock_info(symbol):
 
     return (True, valueDict)
 
-def extract_using_regex(input_string, key):
-    # Match JS assignments like: var key = 'value'; or key="value"
-    pattern = rf"\b{re.escape(key)}\s*=\s*['\"]([^'\"]+)['\"]"
-    match = re.search(pattern, input_string)
-    if match:
-        return match.group(1).strip()
-    return None
-
 def export_to_file(data):
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     csv_file_path = f"fund-stats_{timestamp}.csv"
@@ -317,7 +306,9 @@ if __name__ == "__main__":
     # extract data for funds
     extracted_data = get_stock_prices(funds)
 
-    data_sorted_by_alpha = sorted(extracted_data, key=lambda x: (print(x) or float(x['Alpha'])) if x['Alpha'] and x['Alpha'] != '-' else float('-inf'), reverse=True)
+    # parse every metric to a float once; sorting then compares native numbers
+    extracted_data = [FundRecord.from_dict(fund_data) for fund_data in extracted_data]
+    data_sorted_by_alpha = sort_records(extracted_data, 'Alpha')
     print(f"\033[91m{len(funds_with_no_data)} funds have no data. These are, {funds_with_no_data}.\033[0m")
 
     # export CSV file (existing behavior)
@@ -0,0 +1,277 @@
+import codecs
+import re
+import sys
+import time
+from functools import lru_cache
+
+try:
+    import lxml.html as lxml_html
+except ImportError:  # lxml is optional; BeautifulSoup stays the fallback
+    lxml_html = None
+
+
+CAGR_MAPPING = {'scheme_inception_returns': 'CAGR Since Inception',
+                'scheme_1yr_returns': '1 Year CAGR',
+                'scheme_3yr_returns': '3 Years CAGR',
+                'scheme_5yr_returns': '5 Years CAGR',
+                'scheme_10yr_returns': '10 Years CAGR',
+                'category_1yr_returns': '1 Year Category CAGR',
+                'category_3yr_returns': '3 Years Category CAGR',
+                'category_5yr_returns': '5 Years Category CAGR',
+                'category_10yr_returns': '10 Years Category CAGR',
+                'benchmark_1yr_returns': '1 Year Benchmark CAGR',
+                'benchmark_3yr_returns': '3 Years Benchmark CAGR',
+                'benchmark_5yr_returns': '5 Years Benchmark CAGR',
+                'benchmark_10yr_returns': '10 Years Benchmark CAGR',
+                'scheme_nav': 'NAV',
+                'scheme_benchmark': 'Benchmark Type'}
+
+CONTEXT_MAPPING = {'Category: ': 'Category',
+                   'TER:': 'TER',
+                   'Total Assets:': 'Total Assets (in Cr)',
+                   'Launch Date:': 'Launch Date',
+                   'Turn over:': 'Turn over (%)',
+                   'Standard Deviation': 'Standard Deviation',
+                   'Alpha': 'Alpha',
+                   'Beta': 'Beta',
+                   'Sharpe Ratio': 'Sharpe Ratio'}
+
+SCH_OVER_TABLE_KEYS = {'Category: ',
+                       'TER:',
+                       'Turn over:',
+                       'Total Assets:',
+                       'Launch Date:'}
+
+ADV_TABLE_KEYS = {'Standard Deviation', 'Sharpe Ratio', 'Alpha', 'Beta'}
+
+# Date of the NAV shown on the page, from the same nav-cagr-label div _NAV_LABEL selects
+# ("NAV as on 09-11-2023"). The page's scheme_end_date JS variable is the returns
+# calculator's end date, a day after the NAV, so it must not be used here.
+_NAV_DATE_RE = r'class="[^"]*\bnav-cagr-label\b[^"]*"[^>]*>\s*NAV as on\s*(\d{1,2})-(\d{1,2})-(\d{4})'
+_NAV_DATE_PATTERNS = {False: re.compile(_NAV_DATE_RE), True: re.compile(_NAV_DATE_RE.encode('ascii'))}
+
+BACKENDS = ('lxml', 'bs4')
+DEFAULT_BACKEND = 'lxml' if lxml_html is not None else 'bs4'
+
+# XPath equivalents of BeautifulSoup's class_ matching: a single class name matches
+# any token of the attribute, a space separated value matches the whole attribute.
+_SCH_OVER_TABLES = "//table[contains(concat(' ', normalize-space(@class), ' '), ' sch_over_table ')]"
+_ADV_TABLES = "//table[normalize-space(@class)='adv-table table table-striped']"
+_NAV_LABEL = "(//div[contains(concat(' ', normalize-space(@class), ' '), ' nav-cagr-label ')])[1]"
+_TEXT_CENTER_TD = "td[contains(concat(' ', normalize-space(@class), ' '), ' text-center ')]"
+
+
+def extract_using_regex(input_string, key):
+    # Match JS assignments like: var key = 'value'; or key="value"
+    # Per-key scan, kept as the baseline for the extract_js_vars benchmark below.
+    pattern = rf"\b{re.escape(key)}\s*=\s*['\"]([^'\"]+)['\"]"
+    match = re.search(pattern, input_string)
+    if match:
+        return match.group(1).strip()
+    return None
+
+
+@lru_cache(maxsize=None)
+def _js_var_pattern(keys, binary):
+    alternation = '|'.join(re.escape(k) for k in sorted(keys, key=len, reverse=True))
+    pattern = rf"\b({alternation})\s*=\s*['\"]([^'\"]+)['\"]"
+    return re.compile(pattern.encode() if binary else pattern)
+
+
+def normalize_encoding(label, default='utf-8'):
+    """A response's declared charset as a codec name Python knows; default if absent or unknown."""
+    if label:
+        try:
+            return codecs.lookup(label.strip().strip('"\'')).name
+        except LookupError:
+            pass
+    return default
+
+
+def extract_js_vars(page, keys=tuple(CAGR_MAPPING), encoding='utf-8'):
+    """
+    Pull every `var key = '...'` assignment for the given keys in a single pass.
+    page may be str or the raw response bytes; the first assignment of each key
+    wins, matching extract_using_regex.
+    """
+    binary = isinstance(page, (bytes, bytearray))
+    keys = tuple(keys)
+    found = {}
+    for match in _js_var_pattern(keys, binary).finditer(page):
+        key, value = match.group(1), match.group(2)
+        if binary:
+            key, value = key.decode('ascii'), value.decode(encoding, errors='replace')
+        if key not in found:
+            found[key] = value.strip()
+            if len(found) == len(keys):
+                break
+    return found
+
+
+def extract_nav_date(page, encoding='utf-8'):
+    """
+    The date of the page's NAV ("NAV as on dd-mm-yyyy") as YYYY-MM-DD, or None.
+    page may be str or raw bytes; the label is ASCII, so encoding is unused.
+    """
+    m = _NAV_DATE_PATTERNS[isinstance(page, (bytes, bytearray))].search(page)
+    if not m:
+        return None
+    day, month, year = (int(g) for g in m.groups())
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+
+def parse_fund_page(html, backend=DEFAULT_BACKEND, encoding='utf-8'):
+    """
+    Extract the advisorkhoj fund page fields (JS return variables, scheme overview
+    and risk tables) into a valueDict. Every backend yields the same dict.
+    html may be str or raw bytes in the given encoding.
+    """
+    valueDict = {}
+    js_vars = extract_js_vars(html, encoding=encoding)
+    for key, index in CAGR_MAPPING.items():
+        value = js_vars.get(key)
+        if value:
+            valueDict[index] = value
+
+    if backend == 'lxml' and lxml_html is not None:
+        _parse_dom_lxml(html, valueDict, encoding)
+    elif backend in BACKENDS:
+        if isinstance(html, (bytes, bytearray)):
+            html = html.decode(encoding, errors='replace')
+        _parse_dom_bs4(html, valueDict)
+    else:
+        raise ValueError(f"Unsupported parser backend '{backend}'. Valid: {', '.join(BACKENDS)}")
+    return valueDict
+
+
+def parse_fund_page_timed(html, backend=DEFAULT_BACKEND, encoding='utf-8'):
+    """parse_fund_page plus its duration in seconds, measured where the parse runs (e.g. a worker process)."""
+    start = time.perf_counter()
+    valueDict = parse_fund_page(html, backend, encoding)
+    return valueDict, time.perf_counter() - start
+
+
+def _apply_sch_over_row(valueDict, subrow):
+    for key in SCH_OVER_TABLE_KEYS:
+        if key in subrow:
+            if key == 'TER:':
+                valueDict[CONTEXT_MAPPING[key]] = subrow.replace(key, '').strip().split(" As on ")[0]
+            elif key == 'Total Assets:':
+                valueDict[CONTEXT_MAPPING[key]] = subrow.replace(key, '').strip().split(" Cr As on ")[0]
+            elif key == 'Turn over:':
+                result = subrow.replace(key, '').strip().split("|")[0]
+                valueDict[CONTEXT_MAPPING[key]] = result.strip() if result else result
+            else:
+                valueDict[CONTEXT_MAPPING[key]] = subrow.replace(key, '').strip()
+
+
+def _parse_dom_bs4(html, valueDict):
+    # bs4 is only the fallback backend, so it is imported on first use
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Fallback: extract NAV from DOM if not found via JS vars
+    if 'NAV' not in valueDict:
+        nav_label = soup.find('div', class_='nav-cagr-label')
+        if nav_label and 'NAV as on' in nav_label.get_text():
+            nav_value = nav_label.find_next('h4')
+            if nav_value:
+                valueDict['NAV'] = nav_value.get_text(strip=True).replace('₹', '').replace(',', '')
+
+    for table in soup.find_all('table', class_='sch_over_table'):
+        for row in table.find_all('tr'):
+            _apply_sch_over_row(valueDict, row.find('td').text.strip())
+
+    for table in soup.find_all('table', class_='adv-table table table-striped'):
+        for row in table.find_all('tr'):
+            subrow = row.find('td')
+            if subrow:
+                cleanedsubrow = subrow.text.strip()
+                for key in ADV_TABLE_KEYS:
+                    if key in cleanedsubrow:
+                        valueDict[CONTEXT_MAPPING[key]] = row.find_next('td', {'class': 'text-center'}).text.strip()
+
+
+def _text(el):
+    return ''.join(el.itertext())
+
+
+def _parse_dom_lxml(html, valueDict, encoding='utf-8'):
+    if isinstance(html, (bytes, bytearray)):
+        try:
+            parser = lxml_html.HTMLParser(encoding=encoding)
+        except LookupError:
+            # a codec Python has but libxml2 doesn't know by that name
+            html, parser = html.decode(encoding, errors='replace'), None
+        root = lxml_html.fromstring(html, parser=parser)
+    else:
+        root = lxml_html.fromstring(html)
+
+    if 'NAV' not in valueDict:
+        labels = root.xpath(_NAV_LABEL)
+        if labels and 'NAV as on' in _text(labels[0]):
+            # find_next('h4'): first h4 after the label's start tag, in document order
+            nav_values = labels[0].xpath("(descendant::h4 | following::h4)[1]")
+            if nav_values:
+                nav = ''.join(t.strip() for t in nav_values[0].itertext())
+                valueDict['NAV'] = nav.replace('₹', '').replace(',', '')
+
+    for table in root.xpath(_SCH_OVER_TABLES):
+        for row in table.iter('tr'):
+            td = next(row.iter('td'), None)
+            if td is not None:
+                _apply_sch_over_row(valueDict, _text(td).strip())
+
+    for table in root.xpath(_ADV_TABLES):
+        for row in table.iter('tr'):
+            td = next(row.iter('td'), None)
+            if td is not None:
+                cleanedsubrow = _text(td).strip()
+                for key in ADV_TABLE_KEYS:
+                    if key in cleanedsubrow:
+                        value_td = row.xpath(f"(descendant::{_TEXT_CENTER_TD} | following::{_TEXT_CENTER_TD})[1]")
+                        valueDict[CONTEXT_MAPPING[key]] = _text(value_td[0]).strip()
+
+
+if __name__ == "__main__":
+    # Parity and timing check: python akparser.py [page.html] [iterations]
+    path = sys.argv[1] if len(sys.argv) > 1 else "response-dump.html"
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    with open(path, "rb") as f:
+        raw = f.read()
+    page = raw.decode("utf-8")
+
+    # Micro-benchmark: one regex scan per key versus the single-pass alternation
+    start = time.perf_counter()
+    for _ in range(iterations):
+        per_key = {k: v for k in CAGR_MAPPING if (v := extract_using_regex(page, k))}
+    per_key_ms = (time.perf_counter() - start) / iterations * 1000
+    for label, source in (("str", page), ("bytes", raw)):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            single = {k: v for k, v in extract_js_vars(source).items() if v}
+        single_ms = (time.perf_counter() - start) / iterations * 1000
+        if single != per_key:
+            raise SystemExit(f"❌ extract_js_vars({label}) differs from per-key regex: {single} != {per_key}")
+        print(f"JS vars: {per_key_ms:.3f} ms/page per-key regex, {single_ms:.3f} ms/page single pass over {label}")
+
+    results = {}
+    for backend in BACKENDS:
+        if backend == 'lxml' and lxml_html is None:
+            print("lxml not installed, skipping lxml backend")
+            continue
+        start = time.perf_counter()
+        for _ in range(iterations):
+            results[backend] = parse_fund_page(raw, backend)
+        per_page = (time.perf_counter() - start) / iterations * 1000
+        print(f"{backend:>5}: {per_page:.2f} ms/page ({len(results[backend])} fields)")
+
+    if len(results) == len(BACKENDS):
+        if results['lxml'] == results['bs4']:
+            print("✅ lxml and bs4 backends produce identical valueDict")
+        else:
+            diff = {k: (results['lxml'].get(k), results['bs4'].get(k))
+                    for k in set(results['lxml']) | set(results['bs4'])
+                    if results['lxml'].get(k) != results['bs4'].get(k)}
+            raise SystemExit(f"❌ backend mismatch: {diff}")
@@ -0,0 +1,128 @@
+import asyncio
+import codecs
+from collections.abc import Mapping
+from typing import Any
+from urllib.parse import urlsplit
+
+from concurrency import ConcurrencyController
+from httpcache import ResponseCache
+
+
+DEFAULT_TIMEOUT = 20
+KEEPALIVE_TIMEOUT = 30
+
+
+class FetchResult:
+    __slots__ = ("url", "status", "headers", "body")
+
+    def __init__(self, url: str, status: int, headers: Mapping[str, str], body: bytes):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def charset(self) -> str:
+        """The declared charset as a codec name Python knows; utf-8 if absent or unknown."""
+        content_type = self.headers.get("Content-Type", "")
+        for part in content_type.split(";")[1:]:
+            name, _, value = part.strip().partition("=")
+            if name.lower() == "charset" and value:
+                try:
+                    return codecs.lookup(value.strip().strip('"\'')).name
+                except LookupError:
+                    break
+        return "utf-8"
+
+    @property
+    def text(self) -> str:
+        return self.body.decode(self.charset, errors="replace")
+
+
+def fetch_errors() -> tuple[type[BaseException], ...]:
+    """
+    Exceptions AsyncFetcher.get raises for a failed request. aiohttp is only
+    imported once a fetcher opens, so --help and argument parsing never load it.
+    """
+    import aiohttp
+
+    return (aiohttp.ClientError, asyncio.TimeoutError)
+
+
+class AsyncFetcher:
+    """
+    Shared aiohttp session with keep-alive connection pooling, so every
+    advisorkhoj/Groww request reuses an already-open TLS connection instead of
+    handshaking again. In-flight requests per host are governed by the adaptive
+    ConcurrencyController.
+    """
+
+    def __init__(
+        self,
+        controller: ConcurrencyController | None = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        headers: dict[str, str] | None = None,
+        cache: ResponseCache | None = None,
+    ):
+        self.cache = cache
+        self.controller = controller or ConcurrencyController()
+        self.timeout = timeout
+        self.headers = headers or {}
+        self._session: Any = None  # aiohttp.ClientSession while open
+
+    async def __aenter__(self) -> "AsyncFetcher":
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(
+            limit=0,
+            limit_per_host=0,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=300,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self.cache is not None:
+            self.cache.save()
+
+    async def get(self, url: str, headers: dict[str, str] | None = None) -> FetchResult:
+        if self._session is None:
+            raise RuntimeError("AsyncFetcher must be used as an async context manager")
+        host = (urlsplit(url).hostname or "").lower()
+        entry = self.cache.lookup(url) if self.cache is not None else None
+        if entry is not None and self.cache.is_fresh(entry, host):
+            self.cache.hits += 1
+            return self._cached_result(url, entry)
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            request_headers.update(self.cache.conditional_headers(entry))
+        async with self.controller.slot(url) as slot:
+            async with self._session.get(url, headers=request_headers) as resp:
+                body = await resp.read()
+                status = slot.status = resp.status
+                slot.bytes = len(body)
+                # CIMultiDict copy keeps header lookups case-insensitive
+                resp_headers = resp.headers.copy()
+
+        if self.cache is not None:
+            if status == 304 and entry is not None:
+                self.cache.revalidated += 1
+                self.cache.touch(entry)
+                return self._cached_result(url, entry)
+            self.cache.misses += 1
+            if status == 200:
+                self.cache.store(url, resp_headers, body)
+        return FetchResult(url, status, resp_headers, body)
+
+    def _cached_result(self, url: str, entry: dict[str, Any]) -> FetchResult:
+        headers = {"Content-Type": entry.get("content_type", "")}
+        return FetchResult(url, 200, headers, self.cache.read(entry))
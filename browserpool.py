@@ -0,0 +1,118 @@
+import asyncio
+from typing import Any
+
+from concurrency import ConcurrencyController
+
+
+# Requests a scraper never needs: rendering stays correct without them and pages settle sooner
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "media"})
+BLOCKED_URL_PARTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+)
+
+DEFAULT_BROWSERS = 2
+DEFAULT_PAGES_PER_BROWSER = 8
+DEFAULT_TIMEOUT_MS = 20000
+
+
+async def _block_unneeded(route: Any) -> None:
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or any(part in request.url for part in BLOCKED_URL_PARTS):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+class BrowserPool:
+    """
+    Long-lived headless Chromium browsers, each with several reusable pages.
+    render() borrows an idle page, navigates it, waits for a selector instead of
+    a fixed sleep and returns the rendered HTML. Images, fonts and analytics
+    are blocked for every page.
+    """
+
+    def __init__(
+        self,
+        browsers: int = DEFAULT_BROWSERS,
+        pages_per_browser: int = DEFAULT_PAGES_PER_BROWSER,
+        controller: ConcurrencyController | None = None,
+        headless: bool = True,
+        timeout_ms: int = DEFAULT_TIMEOUT_MS,
+    ):
+        self.browsers = max(1, browsers)
+        self.pages_per_browser = max(1, pages_per_browser)
+        self.controller = controller or ConcurrencyController()
+        self.headless = headless
+        self.timeout_ms = timeout_ms
+        self._playwright = None
+        self._browsers: list[Any] = []
+        self._idle: asyncio.Queue | None = None
+        self.rendered = 0
+        self.failed = 0
+
+    @property
+    def size(self) -> int:
+        return self.browsers * self.pages_per_browser
+
+    async def __aenter__(self) -> "BrowserPool":
+        # Playwright is only needed once a pool starts
+        from playwright.async_api import async_playwright
+
+        self._playwright = await async_playwright().start()
+        self._idle = asyncio.Queue()
+        for _ in range(self.browsers):
+            browser = await self._playwright.chromium.launch(headless=self.headless)
+            self._browsers.append(browser)
+            context = await browser.new_context()
+            await context.route("**/*", _block_unneeded)
+            for _ in range(self.pages_per_browser):
+                self._idle.put_nowait(await context.new_page())
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        for browser in self._browsers:
+            await browser.close()
+        self._browsers = []
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def render(self, url: str, wait_for: str) -> str:
+        page = await self._idle.get()
+        try:
+            async with self.controller.slot(url) as slot:
+                response = await page.goto(url, wait_until="domcontentloaded", timeout=self.timeout_ms)
+                slot.status = response.status if response is not None else None
+            # error pages never render the selector; hand them back as they are
+            if response is None or response.status < 400:
+                await page.wait_for_selector(wait_for, timeout=self.timeout_ms)
+            html = await page.content()
+            self.rendered += 1
+            return html
+        except Exception:
+            self.failed += 1
+            page = await self._replace(page)
+            raise
+        finally:
+            self._idle.put_nowait(page)
+
+    async def _replace(self, page: Any) -> Any:
+        # a crashed or wedged page is replaced rather than handed to the next caller
+        context = page.context
+        try:
+            await page.close()
+        except Exception:
+            pass
+        return await context.new_page()
+
+    def report(self) -> str:
+        return (
+            f"Browser pool: {self.browsers} browsers x {self.pages_per_browser} pages, "
+            f"{self.rendered} rendered, {self.failed} failed"
+        )
@@ -0,0 +1,91 @@
+import csv
+import os
+import shutil
+import tempfile
+from typing import Any
+
+from metrics import REGISTRY
+
+
+class CategorySpillWriter:
+    """
+    Category-grouped CSV export that accepts records in completion order.
+    Each category's rows are spilled to its own temporary segment as they
+    arrive; close() writes the header and concatenates the segments in
+    category order, so only one row is held in memory at a time.
+    """
+
+    def __init__(self, path: str, columns: list[str], category_order: list[str], category_key: str = "Category"):
+        self.path = path
+        self.columns = columns
+        self.category_order = list(category_order)
+        self.category_key = category_key
+        self._known = set(self.category_order)
+        self._tmpdir = tempfile.TemporaryDirectory(prefix=".export-", dir=os.path.dirname(os.path.abspath(path)))
+        self._segments: dict[str, tuple[Any, Any]] = {}
+        self.rows_spilled = 0
+        self.skipped = 0
+        self._closed = False
+
+    def _segment(self, category: str) -> Any:
+        seg = self._segments.get(category)
+        if seg is None:
+            f = open(os.path.join(self._tmpdir.name, f"{len(self._segments)}.csv"), "w+", newline="")
+            seg = (f, csv.writer(f))
+            self._segments[category] = seg
+        return seg[1]
+
+    def add(self, record: dict[str, Any]) -> None:
+        if self.category_key not in record:
+            print("No category for fund " + str(record) + " hence skipping.")
+            self.skipped += 1
+            return
+        category = record.get(self.category_key)
+        if category not in self._known:
+            # only categories listed in the mapping are exported
+            self.skipped += 1
+            return
+        self._segment(category).writerow([record.get(column, '') for column in self.columns])
+        self.rows_spilled += 1
+
+    def close(self) -> str:
+        if self._closed:
+            return os.path.abspath(self.path)
+        self._closed = True
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", newline="") as out:
+                csv.writer(out).writerow(self.columns)
+                for category in self.category_order:
+                    seg = self._segments.get(category)
+                    if seg is None:
+                        continue
+                    csv.writer(out).writerow([category])
+                    f = seg[0]
+                    f.flush()
+                    f.seek(0)
+                    shutil.copyfileobj(f, out)
+            os.replace(tmp_path, self.path)
+            REGISTRY.records_written(os.path.basename(self.path), self.rows_spilled)
+        finally:
+            for f, _ in self._segments.values():
+                f.close()
+            self._tmpdir.cleanup()
+        return os.path.abspath(self.path)
+
+    def abort(self) -> None:
+        """Drop the spilled segments without writing the output file."""
+        if not self._closed:
+            self._closed = True
+            for f, _ in self._segments.values():
+                f.close()
+            self._tmpdir.cleanup()
+
+    def __enter__(self) -> "CategorySpillWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
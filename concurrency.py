@@ -0,0 +1,251 @@
+import asyncio
+import threading
+import time
+from typing import Any
+from urllib.parse import urlsplit
+
+from metrics import REGISTRY
+
+
+class HostPolicy:
+    __slots__ = ("initial", "max_limit", "rps", "burst")
+
+    def __init__(self, initial: int = 4, max_limit: int = 32, rps: float | None = None, burst: int | None = None):
+        self.initial = initial
+        self.max_limit = max_limit
+        self.rps = rps
+        self.burst = burst
+
+
+# Conservative starting points; limits grow from `initial` towards `max_limit` while the host keeps up.
+DEFAULT_POLICIES = {
+    "www.advisorkhoj.com": HostPolicy(initial=4, max_limit=32),
+    "groww.in": HostPolicy(initial=4, max_limit=16, rps=20),
+    "www.screener.in": HostPolicy(initial=2, max_limit=16, rps=4),
+}
+DEFAULT_POLICY = HostPolicy(initial=2, max_limit=8)
+
+MIN_LIMIT = 1
+BACKOFF_FACTOR = 0.5    # on errors, 429 and 5xx
+LATENCY_FACTOR = 0.9    # on latency well above the host's baseline
+LATENCY_TOLERANCE = 2.0
+BASELINE_WEIGHT = 0.05
+THROTTLE_STATUSES = (429, 503)
+DEFAULT_COOLDOWN = 0.5  # seconds, until a host's baseline latency is known
+
+
+def parse_host_values(items: list[str], cast: type = int) -> dict[str, Any]:
+    """Parse repeated HOST=VALUE command line values into a per-host mapping."""
+    values: dict[str, Any] = {}
+    for item in items or []:
+        host, sep, value = item.partition("=")
+        if not sep or not host.strip():
+            raise ValueError(f"Invalid host setting '{item}', expected HOST=VALUE")
+        parsed = cast(value)
+        if parsed <= 0:
+            raise ValueError(f"Value for '{host}' must be positive")
+        values[host.strip().lower()] = parsed
+    return values
+
+
+def parse_host_limits(items: list[str]) -> dict[str, int]:
+    return parse_host_values(items, int)
+
+
+class TokenBucket:
+    """Requests-per-second ceiling. reserve() takes a token and returns how long to wait for it."""
+
+    def __init__(self, rate: float, burst: int | None = None):
+        self.rate = rate
+        self.capacity = float(burst or max(1, int(rate)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class AdaptiveLimiter:
+    """
+    AIMD in-flight limit for one host. Each success adds 1/limit (about +1 per
+    round of requests); errors, 429/503 and 5xx halve the limit, and latency
+    well above the host's running baseline trims it by 10%. Decreases are
+    applied at most once per round trip so one burst of failures counts once.
+    Usable from threads (acquire) and from asyncio (acquire_async).
+    """
+
+    def __init__(self, host: str, policy: HostPolicy):
+        self.host = host
+        self.max_limit = max(MIN_LIMIT, policy.max_limit)
+        self._limit = float(min(max(MIN_LIMIT, policy.initial), self.max_limit))
+        self._bucket = TokenBucket(policy.rps, policy.burst) if policy.rps else None
+        self._inflight = 0
+        self._baseline: float | None = None
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self._async_waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.peak_limit = int(self._limit)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def _try_acquire(self) -> bool:
+        if self._inflight < int(self._limit):
+            self._inflight += 1
+            return True
+        return False
+
+    def acquire(self) -> None:
+        with self._cond:
+            while not self._try_acquire():
+                self._cond.wait()
+        if self._bucket is not None:
+            delay = self._bucket.reserve()
+            if delay:
+                time.sleep(delay)
+
+    async def acquire_async(self) -> None:
+        while True:
+            with self._cond:
+                if self._try_acquire():
+                    break
+                loop = asyncio.get_running_loop()
+                fut = loop.create_future()
+                self._async_waiters.append((loop, fut))
+            await fut
+        if self._bucket is not None:
+            delay = self._bucket.reserve()
+            if delay:
+                await asyncio.sleep(delay)
+
+    def _wake(self) -> None:
+        # caller holds self._cond
+        self._cond.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, fut in waiters:
+            loop.call_soon_threadsafe(lambda f=fut: f.done() or f.set_result(None))
+
+    def _decrease(self, factor: float, now: float) -> None:
+        # one decrease per round trip: failures from the same window of requests count once
+        cooldown = self._baseline if self._baseline is not None else DEFAULT_COOLDOWN
+        if now - self._last_decrease < cooldown:
+            return
+        self._last_decrease = now
+        self._limit = max(float(MIN_LIMIT), self._limit * factor)
+
+    def release(self, latency: float, status: int | None = None, error: bool = False) -> None:
+        now = time.monotonic()
+        with self._cond:
+            self._inflight -= 1
+            self.requests += 1
+            if error or (status is not None and (status in THROTTLE_STATUSES or status >= 500)):
+                if status in THROTTLE_STATUSES:
+                    self.throttled += 1
+                else:
+                    self.errors += 1
+                self._decrease(BACKOFF_FACTOR, now)
+            else:
+                if self._baseline is not None and latency > self._baseline * LATENCY_TOLERANCE:
+                    self._decrease(LATENCY_FACTOR, now)
+                else:
+                    self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+                    self.peak_limit = max(self.peak_limit, int(self._limit))
+                # baseline only learns from successful responses; fast 429s would drag it down
+                self._baseline = latency if self._baseline is None else (
+                    (1 - BASELINE_WEIGHT) * self._baseline + BASELINE_WEIGHT * latency
+                )
+            self._wake()
+
+
+class _Slot:
+    """
+    One request's hold on a host limiter; set .status (and .bytes, the body
+    size, when known) before leaving the block.
+    """
+
+    __slots__ = ("_limiter", "_start", "status", "bytes")
+
+    def __init__(self, limiter: AdaptiveLimiter):
+        self._limiter = limiter
+        self._start = 0.0
+        self.status: int | None = None
+        self.bytes = 0
+
+    def _release(self, failed: bool) -> None:
+        latency = time.monotonic() - self._start
+        self._limiter.release(latency, self.status, failed)
+        REGISTRY.observe_request(self._limiter.host, latency, None if failed else self.status, self.bytes)
+
+    def __enter__(self) -> "_Slot":
+        self._limiter.acquire()
+        self._start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        self._release(exc_type is not None)
+
+    async def __aenter__(self) -> "_Slot":
+        await self._limiter.acquire_async()
+        self._start = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type: Any, *exc: Any) -> None:
+        self._release(exc_type is not None)
+
+
+class ConcurrencyController:
+    """Per-host AdaptiveLimiters shared by every request a scraper makes."""
+
+    def __init__(
+        self,
+        max_limits: dict[str, int] | None = None,
+        rps: dict[str, float] | None = None,
+        policies: dict[str, HostPolicy] | None = None,
+    ):
+        self._policies = dict(DEFAULT_POLICIES)
+        self._policies.update(policies or {})
+        for host, limit in (max_limits or {}).items():
+            base = self._policies.get(host, DEFAULT_POLICY)
+            self._policies[host] = HostPolicy(min(base.initial, limit), limit, base.rps, base.burst)
+        for host, rate in (rps or {}).items():
+            base = self._policies.get(host, DEFAULT_POLICY)
+            self._policies[host] = HostPolicy(base.initial, base.max_limit, rate, base.burst)
+        self._limiters: dict[str, AdaptiveLimiter] = {}
+        self._lock = threading.Lock()
+
+    def policy(self, host: str) -> HostPolicy:
+        return self._policies.get(host, DEFAULT_POLICY)
+
+    def limiter(self, host: str) -> AdaptiveLimiter:
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = AdaptiveLimiter(host, self.policy(host))
+                self._limiters[host] = limiter
+            return limiter
+
+    def slot(self, url: str) -> _Slot:
+        return _Slot(self.limiter((urlsplit(url).hostname or "").lower()))
+
+    def max_workers(self, host: str) -> int:
+        """Thread pool size for a threaded scraper: enough to reach the host's ceiling."""
+        return self.policy(host).max_limit
+
+    def report(self) -> str:
+        lines = ["Concurrency:"]
+        for host, lim in sorted(self._limiters.items()):
+            lines.append(
+                f"  {host}: limit {lim.limit} (peak {lim.peak_limit}/{lim.max_limit}), "
+                f"{lim.requests} requests, {lim.errors} errors, {lim.throttled} throttled"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,337 @@
+import argparse
+import csv
+import fcntl
+import json
+import math
+import mmap
+import os
+import re
+import time
+from array import array
+from datetime import date, datetime
+from typing import Any, Iterable, Iterator
+
+from fundrecord import MISSING, NUMERIC_FIELDS, FundRecord
+
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fund-history")
+SCHEMA_FILE = "schema.json"
+# held while an append assigns fund ids and writes, so concurrent runs don't share ids
+LOCK_FILE = ".lock"
+SCHEMA_VERSION = 1
+# Key columns of every month chunk; metric i lives in m<i>.f64
+FUND_FILE = "fund.u32"
+DAY_FILE = "day.i32"
+_ITEMSIZE = {"I": 4, "i": 4, "d": 8}
+_MONTH_RE = re.compile(r"^\d{4}-\d{2}$")
+# run timestamp in export names like fund-stats_2024-01-12_09-30-00.csv
+_RUN_STAMP_RE = re.compile(r"(\d{4}-\d{2}-\d{2})_\d{2}-\d{2}-\d{2}")
+
+
+def _month(d: date) -> str:
+    return f"{d.year:04d}-{d.month:02d}"
+
+
+def _column_file(index: int) -> str:
+    return f"m{index:03d}.f64"
+
+
+def _map(path: str, typecode: str, rows: int) -> Any:
+    """
+    Read-only view of the first rows items of a column file. The file is
+    memory-mapped, so only the pages a query touches are read from disk.
+    """
+    size = rows * _ITEMSIZE[typecode]
+    try:
+        with open(path, "rb") as f:
+            if rows and os.fstat(f.fileno()).st_size >= size:
+                mm = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+                # the view keeps the mapping alive for as long as the caller holds it
+                return memoryview(mm).cast(typecode)
+    except FileNotFoundError:
+        pass
+    # a metric added to the schema after this month was written
+    return array(typecode, [MISSING] * rows) if typecode == "d" else array(typecode, [0] * rows)
+
+
+class HistoryAppender:
+    """
+    Collects one run's records (add() works as a scrape sink) and appends them
+    to the run's month on close(). Leaving the with block on an exception
+    discards the run.
+    """
+
+    def __init__(self, history: "FundHistory", run_date: date):
+        self.history = history
+        self.day = run_date.toordinal()
+        self.month = _month(run_date)
+        # names, not ids: ids are only assigned under the store lock when the run is appended
+        self.funds: list[str] = []
+        self.columns = {name: array("d") for name in NUMERIC_FIELDS}
+        self.closed = False
+
+    @property
+    def rows(self) -> int:
+        return len(self.funds)
+
+    def add(self, record: FundRecord | dict[str, Any]) -> None:
+        if not isinstance(record, FundRecord):
+            record = FundRecord.from_dict(record)
+        if not record.fund:
+            return
+        for column, value in zip(self.columns.values(), record.values):
+            column.append(value)
+        self.funds.append(record.fund)
+
+    def close(self) -> int:
+        if not self.closed:
+            self.closed = True
+            if self.rows:
+                self.history._append_chunk(self.month, self.day, self.funds, self.columns)
+        return self.rows
+
+    def __enter__(self) -> "HistoryAppender":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.closed = True
+
+
+class FundHistory:
+    """
+    Append-only columnar store of every scrape run's metrics, keyed by (fund,
+    run date). Each month is a directory holding a fund id column, a run-date
+    column and one float64 file per metric (native byte order, NaN where the
+    page had no value), so a query maps only the columns it reads. Fund ids
+    index fund_names in schema.json. A fund stored twice for one day (a re-run)
+    reads back as its latest row. Appends from several processes are
+    serialized by a lock file; queries need no lock.
+    """
+
+    def __init__(self, path: str = DEFAULT_DIR):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._load_schema()
+
+    def _load_schema(self) -> None:
+        self.columns = list(NUMERIC_FIELDS)
+        self.fund_names: list[str] = []
+        schema_path = os.path.join(self.path, SCHEMA_FILE)
+        if os.path.exists(schema_path):
+            with open(schema_path, "r") as f:
+                schema = json.load(f)
+            if schema.get("version") != SCHEMA_VERSION:
+                raise ValueError(f"Unsupported fund history version {schema.get('version')} in {schema_path}")
+            # metrics added to NUMERIC_FIELDS since go on the end, so existing column files keep their meaning
+            self.columns = schema["columns"] + [c for c in NUMERIC_FIELDS if c not in schema["columns"]]
+            self.fund_names = schema["funds"]
+        self._fund_ids = {name: i for i, name in enumerate(self.fund_names)}
+
+    def _fund_id(self, name: str) -> int:
+        fund_id = self._fund_ids.get(name)
+        if fund_id is None:
+            fund_id = self._fund_ids[name] = len(self.fund_names)
+            self.fund_names.append(name)
+        return fund_id
+
+    def _save_schema(self) -> None:
+        path = os.path.join(self.path, SCHEMA_FILE)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": SCHEMA_VERSION, "columns": self.columns, "funds": self.fund_names}, f, indent=1)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _rows(month_dir: str) -> int:
+        try:
+            return min(
+                os.path.getsize(os.path.join(month_dir, FUND_FILE)),
+                os.path.getsize(os.path.join(month_dir, DAY_FILE)),
+            ) // 4
+        except FileNotFoundError:
+            return 0
+
+    def _append_chunk(self, month: str, day: int, funds: list[str], columns: dict[str, array]) -> None:
+        with open(os.path.join(self.path, LOCK_FILE), "a") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            # another run may have appended since this one opened the store
+            self._load_schema()
+            fund_ids = array("I", [self._fund_id(name) for name in funds])
+            missing = array("d", [MISSING]) * len(funds)
+            month_dir = os.path.join(self.path, month)
+            os.makedirs(month_dir, exist_ok=True)
+            rows = self._rows(month_dir)
+            # Metric columns first, keys last: a row only exists once its day is written, and
+            # anything an interrupted append left past the key columns' end is cut off here
+            for i, name in enumerate(self.columns):
+                self._append_column(os.path.join(month_dir, _column_file(i)), "d", rows, columns.get(name, missing))
+            self._save_schema()
+            self._append_column(os.path.join(month_dir, FUND_FILE), "I", rows, fund_ids)
+            self._append_column(os.path.join(month_dir, DAY_FILE), "i", rows, array("i", [day]) * len(funds))
+
+    @staticmethod
+    def _append_column(path: str, typecode: str, rows: int, values: array) -> None:
+        with open(path, "ab") as f:
+            size = os.fstat(f.fileno()).st_size
+            expected = rows * _ITEMSIZE[typecode]
+            if size > expected:
+                f.truncate(expected)
+            elif size < expected:
+                # a metric new to the schema: earlier rows are missing
+                pad = (expected - size) // _ITEMSIZE[typecode]
+                f.write((array("d", [MISSING]) if typecode == "d" else array(typecode, [0])).tobytes() * pad)
+            f.write(values.tobytes())
+
+    def appender(self, run_date: date | None = None) -> HistoryAppender:
+        return HistoryAppender(self, run_date or date.today())
+
+    def append_run(self, records: Iterable[FundRecord | dict[str, Any]], run_date: date | None = None) -> int:
+        """Append one run's records; returns the number of rows stored."""
+        with self.appender(run_date) as appender:
+            for record in records:
+                appender.add(record)
+        return appender.rows
+
+    def months(self, start: date | None = None, end: date | None = None) -> list[str]:
+        first = _month(start) if start else ""
+        last = _month(end) if end else "9999-99"
+        return sorted(
+            name for name in os.listdir(self.path)
+            if _MONTH_RE.match(name) and first <= name <= last and os.path.isdir(os.path.join(self.path, name))
+        )
+
+    def _chunks(self, start: date | None, end: date | None) -> Iterator[tuple[str, int, Any, Any, int, int]]:
+        lo = start.toordinal() if start else 0
+        hi = end.toordinal() if end else date.max.toordinal()
+        for month in self.months(start, end):
+            month_dir = os.path.join(self.path, month)
+            rows = self._rows(month_dir)
+            if rows:
+                yield (
+                    month_dir,
+                    rows,
+                    _map(os.path.join(month_dir, FUND_FILE), "I", rows),
+                    _map(os.path.join(month_dir, DAY_FILE), "i", rows),
+                    lo,
+                    hi,
+                )
+
+    def _metric_file(self, metric: str) -> str:
+        try:
+            return _column_file(self.columns.index(metric))
+        except ValueError:
+            raise KeyError(f"Unknown metric '{metric}'") from None
+
+    def fund_history(
+        self,
+        fund: str,
+        metrics: Iterable[str] | None = None,
+        start: date | None = None,
+        end: date | None = None,
+    ) -> tuple[array, dict[str, array]]:
+        """
+        One fund's runs in date order as (run dates as date ordinals, metric ->
+        values), reading only the requested metrics' files (all by default).
+        """
+        # pick up funds other runs appended; the schema is written before their rows
+        self._load_schema()
+        metrics = list(self.columns if metrics is None else metrics)
+        files = [self._metric_file(m) for m in metrics]
+        fund_id = self._fund_ids.get(fund)
+        latest: dict[int, tuple[str, int, int]] = {}
+        if fund_id is not None:
+            for month_dir, rows, funds, days, lo, hi in self._chunks(start, end):
+                for row, fid in enumerate(funds):
+                    if fid == fund_id and lo <= days[row] <= hi:
+                        latest[days[row]] = (month_dir, rows, row)
+        out_days = array("i", sorted(latest))
+        out = {metric: array("d") for metric in metrics}
+        mapped: dict[tuple[str, str], Any] = {}
+        for day in out_days:
+            month_dir, rows, row = latest[day]
+            for metric, name in zip(metrics, files):
+                column = mapped.get((month_dir, name))
+                if column is None:
+                    column = mapped[(month_dir, name)] = _map(os.path.join(month_dir, name), "d", rows)
+                out[metric].append(column[row])
+        return out_days, out
+
+    def metric_history(
+        self, metric: str, start: date | None = None, end: date | None = None
+    ) -> tuple[array, array, array]:
+        """
+        One metric for every fund as (fund ids, run dates as date ordinals,
+        values), ordered by date then fund id; only that metric's file is read.
+        Fund ids index fund_names as reloaded by the query.
+        """
+        self._load_schema()
+        name = self._metric_file(metric)
+        latest: dict[tuple[int, int], float] = {}
+        for month_dir, rows, funds, days, lo, hi in self._chunks(start, end):
+            values = _map(os.path.join(month_dir, name), "d", rows)
+            for row, fid in enumerate(funds):
+                day = days[row]
+                if lo <= day <= hi:
+                    latest[(day, fid)] = values[row]
+        keys = sorted(latest)
+        return (
+            array("I", [fid for _, fid in keys]),
+            array("i", [day for day, _ in keys]),
+            array("d", [latest[key] for key in keys]),
+        )
+
+    def import_csv(self, csv_path: str, run_date: date | None = None) -> int:
+        """
+        Backfill one fund-stats CSV export; the run date defaults to the
+        timestamp in its file name. Category heading rows are skipped.
+        """
+        if run_date is None:
+            m = _RUN_STAMP_RE.search(os.path.basename(csv_path))
+            if not m:
+                raise ValueError(f"No run timestamp in '{csv_path}'; pass the run date")
+            run_date = datetime.strptime(m.group(1), "%Y-%m-%d").date()
+        with open(csv_path, "r", newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            rows = (dict(zip(header, row)) for row in reader if len(row) == len(header))
+            return self.append_run(rows, run_date)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query or backfill the fund history store")
+    parser.add_argument("--history-dir", default=DEFAULT_DIR, help="History store directory")
+    parser.add_argument("--import", dest="imports", nargs="+", default=[], metavar="CSV", help="Backfill fund-stats_<timestamp>.csv exports")
+    parser.add_argument("--fund", help="Print this fund's history")
+    parser.add_argument("--metric", action="append", default=[], help="Metric to print (repeatable); alone, prints it across all funds")
+    args = parser.parse_args(argv)
+
+    history = FundHistory(args.history_dir)
+    for path in sorted(args.imports):
+        print(f"{history.import_csv(path)} funds imported from {path}")
+
+    if args.fund:
+        start = time.perf_counter()
+        days, values = history.fund_history(args.fund, args.metric or None)
+        query_ms = (time.perf_counter() - start) * 1000
+        for i, day in enumerate(days):
+            cells = ", ".join(f"{m!r}={v[i]:g}" for m, v in values.items() if not math.isnan(v[i]))
+            print(f"{date.fromordinal(day)}  {cells}")
+        print(f"{len(days)} runs of '{args.fund}' in {query_ms:.1f} ms")
+    elif args.metric:
+        for metric in args.metric:
+            start = time.perf_counter()
+            funds, days, values = history.metric_history(metric)
+            query_ms = (time.perf_counter() - start) * 1000
+            for fid, day, value in zip(funds, days, values):
+                if not math.isnan(value):
+                    print(f"{date.fromordinal(day)}  {history.fund_names[fid]}  {value:g}")
+            print(f"{len(values)} rows of '{metric}' in {query_ms:.1f} ms")
+    elif not args.imports:
+        print(f"{len(history.fund_names)} funds across months: {', '.join(history.months()) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
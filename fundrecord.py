@@ -0,0 +1,173 @@
+import re
+import sys
+from array import array
+from typing import Any, Iterable
+
+
+# Marker for a metric the page did not provide (or gave as "-", "N/A", ...). NaN keeps
+# the column a plain array of doubles; test with is_missing(), never with ==.
+MISSING = float("nan")
+
+TEXT_FIELDS = ("Fund", "Category", "Scheme Code", "Launch Date", "Benchmark Type")
+NUMERIC_FIELDS = (
+    "Total Assets (in Cr)",
+    "TER",
+    "Turn over (%)",
+    "CAGR Since Inception",
+    "1 Year CAGR",
+    "1 Year Category CAGR",
+    "1 Year Benchmark CAGR",
+    "3 Years CAGR",
+    "3 Years Category CAGR",
+    "3 Years Benchmark CAGR",
+    "5 Years CAGR",
+    "5 Years Category CAGR",
+    "5 Years Benchmark CAGR",
+    "10 Years CAGR",
+    "10 Years Category CAGR",
+    "10 Years Benchmark CAGR",
+    "NAV",
+    "Alpha",
+    "Beta",
+    "Standard Deviation",
+    "Sharpe Ratio",
+    "Volatility",
+    "Mean",
+    "Sortino Ratio",
+    "Up Market Capture\nRatio",
+    "Down Market Capture\nRatio",
+    "Maximum Drawdown",
+    "R-Squared",
+    "Information Ratio",
+    "P/E Ratio",
+    "P/B Ratio",
+    "Small Cap",
+    "Mid Cap",
+    "Large Cap",
+    "Others",
+)
+
+_TEXT_ATTRS = {
+    "Fund": "fund",
+    "Category": "category",
+    "Scheme Code": "scheme_code",
+    "Launch Date": "launch_date",
+    "Benchmark Type": "benchmark_type",
+}
+_NUMERIC_INDEX = {name: i for i, name in enumerate(NUMERIC_FIELDS)}
+_BLANK_VALUES = array("d", [MISSING] * len(NUMERIC_FIELDS))
+
+# leading number of strings like "16,633.52", "1.72%", "₹65.16" or "1.23 As on 12-Jan-2024"
+_NUMBER_RE = re.compile(r"[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?")
+
+
+def is_missing(value: float) -> bool:
+    return value != value
+
+
+def parse_number(value: Any) -> float:
+    """Convert a scraped metric to a float, or MISSING when it holds no number."""
+    if value is None or isinstance(value, bool):
+        return MISSING
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).replace(",", "").replace("₹", "").strip()
+    m = _NUMBER_RE.match(text)
+    return float(m.group()) if m else MISSING
+
+
+class FundRecord:
+    """
+    One fund's scraped data: the descriptive fields as attributes and every
+    metric as a float in a fixed-order array('d'), parsed once when the record
+    is built. get() mirrors dict.get, so exporters can take either form.
+    """
+
+    __slots__ = ("fund", "category", "scheme_code", "launch_date", "benchmark_type", "values", "extra")
+
+    def __init__(self) -> None:
+        self.fund = None
+        self.category = None
+        self.scheme_code = None
+        self.launch_date = None
+        self.benchmark_type = None
+        self.values = array("d", _BLANK_VALUES)
+        self.extra: dict[str, Any] | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "FundRecord":
+        rec = cls()
+        rec.update(data)
+        return rec
+
+    def update(self, data: dict[str, Any]) -> None:
+        """Set fields from a scraped dict, parsing metrics the same way from_dict does."""
+        for key, value in data.items():
+            i = _NUMERIC_INDEX.get(key)
+            if i is not None:
+                self.values[i] = parse_number(value)
+                continue
+            attr = _TEXT_ATTRS.get(key)
+            if attr is not None:
+                setattr(self, attr, value)
+            elif value is not None:
+                # fields outside the known layout are kept as-is
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[key] = value
+
+    def number(self, column: str) -> float:
+        """The metric as a float; MISSING if absent."""
+        return self.values[_NUMERIC_INDEX[column]]
+
+    def get(self, column: str, default: Any = None) -> Any:
+        i = _NUMERIC_INDEX.get(column)
+        if i is not None:
+            value = self.values[i]
+            return default if value != value else value
+        attr = _TEXT_ATTRS.get(column)
+        if attr is not None:
+            value = getattr(self, attr)
+            return default if value is None else value
+        if self.extra is not None:
+            return self.extra.get(column, default)
+        return default
+
+    def __getitem__(self, column: str) -> Any:
+        value = self.get(column)
+        if value is None:
+            raise KeyError(column)
+        return value
+
+    def __contains__(self, column: str) -> bool:
+        return self.get(column) is not None
+
+    def to_dict(self) -> dict[str, Any]:
+        out = {}
+        for column, attr in _TEXT_ATTRS.items():
+            value = getattr(self, attr)
+            if value is not None:
+                out[column] = value
+        for column, value in zip(NUMERIC_FIELDS, self.values):
+            if value == value:
+                out[column] = value
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + sys.getsizeof(self.values) + (sys.getsizeof(self.extra) if self.extra else 0)
+
+    def __repr__(self) -> str:
+        return f"FundRecord({self.to_dict()!r})"
+
+
+def sort_records(records: Iterable[FundRecord], column: str, descending: bool = True) -> list[FundRecord]:
+    """Sort on a metric's native float; funds missing it always go last."""
+    i = _NUMERIC_INDEX[column]
+    present = []
+    missing = []
+    for rec in records:
+        (missing if is_missing(rec.values[i]) else present).append(rec)
+    present.sort(key=lambda rec: rec.values[i], reverse=descending)
+    return present + missing
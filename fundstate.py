@@ -0,0 +1,89 @@
+import json
+import sqlite3
+import time
+from datetime import date, datetime, timedelta
+from typing import Any
+
+
+# Hour (local time) by which AMCs have published the day's NAV
+NAV_PUBLISH_HOUR = 21
+# Version 1: nav_date is the page's "NAV as on" date (older rows held the day after it)
+STATE_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fund_state (
+    ak_key TEXT PRIMARY KEY,
+    nav_date TEXT,
+    content_hash TEXT NOT NULL,
+    record TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+)
+"""
+
+
+def next_nav_publication(nav_date: date) -> datetime:
+    """Earliest moment a NAV newer than nav_date can be published: the next weekday's evening."""
+    day = nav_date + timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return datetime(day.year, day.month, day.day, NAV_PUBLISH_HOUR)
+
+
+class FundState:
+    """SQLite store of each fund's last NAV date, page content hash and parsed record."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(_SCHEMA)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < STATE_VERSION:
+            # dates from older versions can't be trusted; those funds are refetched once
+            self._conn.execute("UPDATE fund_state SET nav_date = NULL")
+            self._conn.execute(f"PRAGMA user_version = {STATE_VERSION}")
+            self._conn.commit()
+        self.skipped = 0
+        self.unchanged = 0
+        self.updated = 0
+
+    def get(self, ak_key: str) -> dict[str, Any] | None:
+        row = self._conn.execute(
+            "SELECT nav_date, content_hash, record, fetched_at FROM fund_state WHERE ak_key = ?",
+            (ak_key,),
+        ).fetchone()
+        if row is None:
+            return None
+        nav_date, content_hash, record, fetched_at = row
+        return {
+            "nav_date": nav_date,
+            "content_hash": content_hash,
+            "record": json.loads(record),
+            "fetched_at": fetched_at,
+        }
+
+    def is_current(self, state: dict[str, Any], now: datetime | None = None) -> bool:
+        """True while no NAV newer than the stored one can have been published."""
+        if not state.get("nav_date"):
+            return False
+        try:
+            nav_date = date.fromisoformat(state["nav_date"])
+        except ValueError:
+            return False
+        now = now or datetime.now()
+        return now < next_nav_publication(nav_date)
+
+    def put(self, ak_key: str, nav_date: str | None, content_hash: str, record: dict[str, Any]) -> None:
+        # risk-ratio workbook cells can be datetimes or Decimals; they are stored as their text
+        self._conn.execute(
+            "INSERT OR REPLACE INTO fund_state (ak_key, nav_date, content_hash, record, fetched_at) VALUES (?, ?, ?, ?, ?)",
+            (ak_key, nav_date, content_hash, json.dumps(record, default=str), time.time()),
+        )
+
+    def close(self) -> None:
+        self._conn.commit()
+        self._conn.close()
+
+    def report(self) -> str:
+        return (
+            f"Incremental: {self.skipped} funds skipped (no new NAV possible), "
+            f"{self.unchanged} refetched but unchanged, {self.updated} reparsed"
+        )
@@ -0,0 +1,152 @@
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from datetime import date
+from typing import Any, Iterable
+
+from asyncfetcher import AsyncFetcher, fetch_errors
+
+
+GROWW_STATS_URL = "https://groww.in/v1/api/data/mf/web/v1/scheme/portfolio/{scheme_code}/stats"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS groww_stats (
+    scheme_code TEXT PRIMARY KEY,
+    day TEXT NOT NULL,
+    pe REAL,
+    pb REAL,
+    fetched_at REAL NOT NULL
+)
+"""
+
+
+def groww_stats_url(scheme_code: str) -> str:
+    return GROWW_STATS_URL.format(scheme_code=scheme_code)
+
+
+def parse_groww_stats(body: bytes | str) -> dict[str, Any]:
+    """Decode a Groww portfolio stats response; callers read 'pe' and 'pb'."""
+    data = json.loads(body)
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected a JSON object from Groww, got {type(data).__name__}")
+    return data
+
+
+def load_amfi_codes(mapping_json_path: str) -> list[str]:
+    """Distinct amfiKey values from funds_and_categories_with_mftools.json."""
+    with open(mapping_json_path, "r") as f:
+        payload = json.load(f)
+    codes = []
+    for rec in payload.get("funds", []):
+        amfi = rec.get("amfiKey")
+        if amfi is None:
+            continue
+        code = str(amfi).strip()
+        if code and code.lower() != "nan":
+            codes.append(code)
+    return list(dict.fromkeys(codes))
+
+
+class GrowwStatsStore:
+    """
+    Daily snapshot of Groww P/E and P/B keyed by AMFI scheme code. A code is
+    fetched at most once per day; concurrent requests for the same code share
+    one in-flight fetch.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(_SCHEMA)
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.fetched = 0
+        self.reused = 0
+        self.failed = 0
+
+    def get(self, scheme_code: str) -> dict[str, Any] | None:
+        row = self._conn.execute(
+            "SELECT pe, pb FROM groww_stats WHERE scheme_code = ? AND day = ?",
+            (scheme_code, date.today().isoformat()),
+        ).fetchone()
+        if row is None:
+            return None
+        return {"pe": row[0], "pb": row[1]}
+
+    def put(self, scheme_code: str, data: dict[str, Any]) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO groww_stats (scheme_code, day, pe, pb, fetched_at) VALUES (?, ?, ?, ?, ?)",
+            (scheme_code, date.today().isoformat(), data.get("pe"), data.get("pb"), time.time()),
+        )
+
+    async def fetch(self, fetcher: Any, scheme_code: str) -> dict[str, Any] | None:
+        stats = self.get(scheme_code)
+        if stats is not None:
+            self.reused += 1
+            return stats
+        pending = self._inflight.get(scheme_code)
+        if pending is None:
+            pending = asyncio.ensure_future(self._fetch(fetcher, scheme_code))
+            self._inflight[scheme_code] = pending
+            pending.add_done_callback(lambda _: self._inflight.pop(scheme_code, None))
+        return await asyncio.shield(pending)
+
+    async def _fetch(self, fetcher: Any, scheme_code: str) -> dict[str, Any] | None:
+        try:
+            resp = await fetcher.get(groww_stats_url(scheme_code))
+            if resp.status != 200:
+                self.failed += 1
+                return None
+            data = parse_groww_stats(resp.body)
+        except (*fetch_errors(), ValueError):
+            self.failed += 1
+            return None
+        self.put(scheme_code, data)
+        self.fetched += 1
+        return {"pe": data.get("pe"), "pb": data.get("pb")}
+
+    async def prefetch(self, fetcher: Any, scheme_codes: Iterable[str]) -> None:
+        await asyncio.gather(*(self.fetch(fetcher, code) for code in dict.fromkeys(scheme_codes)))
+
+    def prefetch_sync(self, scheme_codes: Iterable[str], controller: Any = None) -> None:
+        """Prefetch from synchronous code with a private pooled fetcher."""
+        async def run() -> None:
+            async with AsyncFetcher(controller=controller) as fetcher:
+                await self.prefetch(fetcher, scheme_codes)
+
+        asyncio.run(run())
+
+    def close(self) -> None:
+        self._conn.commit()
+        self._conn.close()
+
+    def report(self) -> str:
+        return (
+            f"Groww stats: {self.fetched} fetched, {self.reused} served from today's snapshot, "
+            f"{self.failed} failed"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prefetch today's Groww P/E and P/B snapshot for every mapped scheme")
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser.add_argument(
+        "--mapping-json",
+        default=os.path.join(script_dir, "funds_and_categories_with_mftools.json"),
+        help="Path to funds_and_categories_with_mftools.json",
+    )
+    parser.add_argument(
+        "--store",
+        default=os.path.join(script_dir, "groww-stats.sqlite3"),
+        help="SQLite snapshot store path",
+    )
+    args = parser.parse_args()
+
+    store = GrowwStatsStore(args.store)
+    try:
+        store.prefetch_sync(load_amfi_codes(args.mapping_json))
+    finally:
+        store.close()
+    print(store.report())
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import time
+from collections.abc import Mapping
+from typing import Any
+
+
+# Freshness window (seconds) per host; after it lapses the entry is revalidated
+# with a conditional GET instead of being downloaded again.
+DEFAULT_TTLS = {
+    "www.advisorkhoj.com": 3600,
+    "groww.in": 6 * 3600,
+}
+DEFAULT_TTL = 3600
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+INDEX_FILE = "index.json"
+
+
+class ResponseCache:
+    """
+    Persistent response cache. Bodies are stored once under their SHA-256 digest
+    (so identical pages share a file) and an index maps each URL to its digest,
+    validators (ETag / Last-Modified) and timestamps. The least recently used
+    entries are evicted once the stored bodies exceed max_bytes.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        ttls: dict[str, int] | None = None,
+        default_ttl: int = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.cache_dir = cache_dir
+        self.body_dir = os.path.join(cache_dir, "bodies")
+        self.ttls = dict(DEFAULT_TTLS)
+        self.ttls.update(ttls or {})
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        os.makedirs(self.body_dir, exist_ok=True)
+        self._index: dict[str, dict[str, Any]] = self._load_index()
+
+    def _load_index(self) -> dict[str, dict[str, Any]]:
+        path = os.path.join(self.cache_dir, INDEX_FILE)
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _body_path(self, digest: str) -> str:
+        return os.path.join(self.body_dir, digest)
+
+    def lookup(self, url: str) -> dict[str, Any] | None:
+        entry = self._index.get(url)
+        if entry is None or not os.path.exists(self._body_path(entry["digest"])):
+            return None
+        return entry
+
+    def is_fresh(self, entry: dict[str, Any], host: str) -> bool:
+        ttl = self.ttls.get(host, self.default_ttl)
+        return time.time() - entry["stored_at"] < ttl
+
+    def conditional_headers(self, entry: dict[str, Any]) -> dict[str, str]:
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def read(self, entry: dict[str, Any]) -> bytes:
+        entry["last_used"] = time.time()
+        with open(self._body_path(entry["digest"]), "rb") as f:
+            return f.read()
+
+    def store(self, url: str, headers: Mapping[str, str], body: bytes) -> None:
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._body_path(digest)
+        if not os.path.exists(path):
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, path)
+        now = time.time()
+        self._index[url] = {
+            "digest": digest,
+            "size": len(body),
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "content_type": headers.get("Content-Type", ""),
+            "stored_at": now,
+            "last_used": now,
+        }
+
+    def touch(self, entry: dict[str, Any]) -> None:
+        # A 304 proves the stored body is still current, so restart its TTL.
+        entry["stored_at"] = time.time()
+
+    def evict(self) -> None:
+        refs: dict[str, int] = {}
+        total = 0
+        for entry in self._index.values():
+            if entry["digest"] not in refs:
+                refs[entry["digest"]] = 0
+                total += entry["size"]
+            refs[entry["digest"]] += 1
+        if total > self.max_bytes:
+            for url, entry in sorted(self._index.items(), key=lambda kv: kv[1]["last_used"]):
+                if total <= self.max_bytes:
+                    break
+                del self._index[url]
+                refs[entry["digest"]] -= 1
+                if refs[entry["digest"]] == 0:
+                    del refs[entry["digest"]]
+                    total -= entry["size"]
+        for name in os.listdir(self.body_dir):
+            if name not in refs:
+                try:
+                    os.remove(self._body_path(name))
+                except OSError:
+                    pass
+
+    def save(self) -> None:
+        self.evict()
+        path = os.path.join(self.cache_dir, INDEX_FILE)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp, path)
+
+    def report(self) -> str:
+        total = self.hits + self.revalidated + self.misses
+        served = self.hits + self.revalidated
+        rate = (served / total * 100) if total else 0.0
+        return (
+            f"HTTP cache: {total} requests, {self.hits} fresh hits, "
+            f"{self.revalidated} revalidated (304), {self.misses} downloaded "
+            f"-> {rate:.1f}% served from cache"
+        )
@@ -1,14 +1,29 @@
-from playwright.sync_api import sync_playwright
+import json
+import time
 
+import requests
 
-def get_jsessionid(headless: bool = False, slow_mo: int = 400) -> tuple[str | None, str | None]:
+
+SESSION_FILE = "mft_session.json"
+# Any page behind the login: it answers 200 for a live session and redirects to /login otherwise
+AUTH_CHECK_URL = "https://www.mutualfundtools.com/advisorytools"
+AUTH_CHECK_TIMEOUT = 15
+
+
+def get_jsessionid(
+    headless: bool = False, slow_mo: int = 400, session_path: str = SESSION_FILE
+) -> tuple[str | None, str | None]:
     """
     Launches a Chromium browser, navigates to the MutualFundTools login page,
     waits for manual CAPTCHA entry and login, then extracts and returns:
       - JSESSIONID
       - session_cookie (if present)
-    The function also persists the Playwright storage state to 'mft_session.json'.
+    The function also persists the Playwright storage state to session_path,
+    which get_session() reuses on later runs.
     """
+    # Playwright is only needed when a fresh login is unavoidable
+    from playwright.sync_api import sync_playwright
+
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=headless, slow_mo=slow_mo)
         context = browser.new_context()
@@ -30,15 +45,67 @@ def get_jsessionid(headless: bool = False, slow_mo: int = 400) -> tuple[str | No
         jsessionid = next((c["value"] for c in cookies if c.get("name") == "JSESSIONID"), None)
         session_cookie = next((c["value"] for c in cookies if c.get("name") == "session_cookie"), None)
 
-        # Persist session to reuse later if desired
-        context.storage_state(path="mft_session.json")
+        # Persist session so the next run can skip the browser
+        context.storage_state(path=session_path)
 
         browser.close()
         return jsessionid, session_cookie
 
 
+def load_session(session_path: str = SESSION_FILE) -> tuple[str | None, str | None]:
+    """JSESSIONID and session_cookie from a stored Playwright storage state, skipping expired cookies."""
+    try:
+        with open(session_path, "r") as f:
+            cookies = json.load(f).get("cookies", [])
+    except (OSError, ValueError, AttributeError):
+        return None, None
+    now = time.time()
+    # Playwright stores session cookies with expires == -1
+    live = {
+        c.get("name"): c.get("value")
+        for c in cookies
+        if isinstance(c, dict) and not (0 <= c.get("expires", -1) < now)
+    }
+    return live.get("JSESSIONID"), live.get("session_cookie")
+
+
+def session_is_valid(jsessionid: str | None, session_cookie: str | None = None) -> bool:
+    """One cheap authenticated request: the body is never read and redirects are not followed."""
+    if not jsessionid:
+        return False
+    from mftdownloader import open_session
+
+    try:
+        with open_session(jsessionid, session_cookie) as session:
+            with session.get(AUTH_CHECK_URL, allow_redirects=False, stream=True, timeout=AUTH_CHECK_TIMEOUT) as resp:
+                return resp.status_code == 200
+    except requests.RequestException:
+        return False
+
+
+def get_session(
+    headless: bool = False,
+    slow_mo: int = 400,
+    session_path: str = SESSION_FILE,
+    allow_login: bool = True,
+) -> tuple[str | None, str | None]:
+    """
+    Cookies of a live MutualFundTools session. The stored session is reused when
+    the server still accepts it; the browser login only runs once it has expired
+    (and only if allow_login, so unattended runs never wait on a CAPTCHA).
+    """
+    jsessionid, session_cookie = load_session(session_path)
+    if session_is_valid(jsessionid, session_cookie):
+        print(f"✅ Reusing the stored session from {session_path}")
+        return jsessionid, session_cookie
+    if not allow_login:
+        return None, None
+    print("Stored session missing or expired; starting the browser login")
+    return get_jsessionid(headless=headless, slow_mo=slow_mo, session_path=session_path)
+
+
 if __name__ == "__main__":
-    js, sess = get_jsessionid(headless=False)
+    js, sess = get_session(headless=False)
     print(f"JSESSIONID={js}")
     if sess:
         print(f"session_cookie={sess}")
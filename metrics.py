@@ -0,0 +1,216 @@
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from typing import Any, Iterator
+
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "metrics")
+PREFIX = "stockscraper"
+
+# Upper bounds in seconds (Prometheus "le"); the +Inf bucket is implied
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PARSE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        i = 0
+        while i < len(self.bounds) and value > self.bounds[i]:
+            i += 1
+        self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation (inf past the last bound)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "buckets": {str(b): n for b, n in zip(self.bounds + ("+Inf",), self.counts)},
+            "p50_le": self.quantile(0.5),
+            "p99_le": self.quantile(0.99),
+        }
+
+
+class Metrics:
+    """
+    Counters and histograms for one run: stage durations, per-host request
+    latency, status codes and bytes, parse time per page kind and records
+    written per output. Thread-safe; the scrapers record into REGISTRY and each
+    entry point writes it out with write_reports() when it finishes.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.stages: dict[str, list[float]] = {}  # name -> [runs, seconds]
+        self.latency: dict[str, Histogram] = {}
+        self.statuses: dict[tuple[str, str], int] = {}
+        self.bytes: dict[str, int] = {}
+        self.parse: dict[str, Histogram] = {}
+        self.records: dict[str, int] = {}
+        # callables taking a stage name and returning a context manager entered around the stage (see profiling)
+        self.stage_hooks: list[Any] = []
+
+    def record_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            runs = self.stages.setdefault(name, [0, 0.0])
+            runs[0] += 1
+            runs[1] += seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        with ExitStack() as hooks:
+            for hook in list(self.stage_hooks):
+                hooks.enter_context(hook(name))
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                self.record_stage(name, time.perf_counter() - start)
+
+    def observe_request(self, host: str, seconds: float, status: int | None, nbytes: int = 0) -> None:
+        """status None means the request failed without a response."""
+        with self._lock:
+            hist = self.latency.get(host)
+            if hist is None:
+                hist = self.latency[host] = Histogram(LATENCY_BUCKETS)
+            hist.observe(seconds)
+            key = (host, str(status) if status is not None else "error")
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+            if nbytes:
+                self.bytes[host] = self.bytes.get(host, 0) + nbytes
+
+    def observe_parse(self, kind: str, seconds: float) -> None:
+        with self._lock:
+            hist = self.parse.get(kind)
+            if hist is None:
+                hist = self.parse[kind] = Histogram(PARSE_BUCKETS)
+            hist.observe(seconds)
+
+    def records_written(self, output: str, n: int) -> None:
+        with self._lock:
+            self.records[output] = self.records.get(output, 0) + n
+
+    def to_dict(self, job: str) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "job": job,
+                "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+                "elapsed_s": round(time.time() - self.started, 3),
+                "stages": {name: {"runs": r, "seconds": round(s, 6)} for name, (r, s) in self.stages.items()},
+                "hosts": {
+                    host: {
+                        "latency_s": hist.to_dict(),
+                        "statuses": {st: n for (h, st), n in sorted(self.statuses.items()) if h == host},
+                        "bytes": self.bytes.get(host, 0),
+                    }
+                    for host, hist in sorted(self.latency.items())
+                },
+                "parse_s": {kind: hist.to_dict() for kind, hist in sorted(self.parse.items())},
+                "records_written": dict(self.records),
+            }
+
+    def to_prometheus(self, job: str) -> str:
+        lines: list[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> str:
+            full = f"{PREFIX}_{name}"
+            lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} {kind}")
+            return full
+
+        def labels(**items: str) -> str:
+            body = ",".join(f'{k}="{_escape(v)}"' for k, v in {"job": job, **items}.items())
+            return "{" + body + "}"
+
+        def histogram(full: str, hist: Histogram, **items: str) -> None:
+            cumulative = 0
+            for bound, n in zip(hist.bounds + (float("inf"),), hist.counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{full}_bucket{labels(**items, le=le)} {cumulative}")
+            lines.append(f"{full}_sum{labels(**items)} {hist.total!r}")
+            lines.append(f"{full}_count{labels(**items)} {hist.count}")
+
+        with self._lock:
+            name = family("last_run_timestamp_seconds", "gauge", "Unix time the run's report was written.")
+            lines.append(f"{name}{labels()} {time.time():.3f}")
+            name = family("run_duration_seconds", "gauge", "Wall time from the start of the run to the report.")
+            lines.append(f"{name}{labels()} {time.time() - self.started:.3f}")
+            if self.stages:
+                name = family("stage_duration_seconds", "gauge", "Seconds spent in each pipeline stage.")
+                for stage, (_, seconds) in self.stages.items():
+                    lines.append(f"{name}{labels(stage=stage)} {seconds!r}")
+            if self.latency:
+                name = family("http_request_duration_seconds", "histogram", "Request latency per host.")
+                for host, hist in sorted(self.latency.items()):
+                    histogram(name, hist, host=host)
+                name = family("http_responses_total", "counter", "Responses per host and status code.")
+                for (host, status), n in sorted(self.statuses.items()):
+                    lines.append(f"{name}{labels(host=host, status=status)} {n}")
+            if self.bytes:
+                name = family("http_response_bytes_total", "counter", "Response body bytes downloaded per host.")
+                for host, n in sorted(self.bytes.items()):
+                    lines.append(f"{name}{labels(host=host)} {n}")
+            if self.parse:
+                name = family("parse_duration_seconds", "histogram", "Parse time per page.")
+                for kind, hist in sorted(self.parse.items()):
+                    histogram(name, hist, page=kind)
+            if self.records:
+                name = family("records_written_total", "counter", "Rows written per output file.")
+                for output, n in sorted(self.records.items()):
+                    lines.append(f"{name}{labels(output=output)} {n}")
+        return "\n".join(lines) + "\n"
+
+    def write_reports(self, job: str, directory: str | None = DEFAULT_DIR) -> tuple[str, str] | None:
+        """
+        Write '<job>.json' and '<job>.prom' (for node_exporter's textfile
+        collector) into directory, each swapped into place atomically.
+        A directory of None turns reporting off.
+        """
+        if not directory:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for ext, text in (
+            ("json", json.dumps(self.to_dict(job), indent=2)),
+            ("prom", self.to_prometheus(job)),
+        ):
+            path = os.path.join(directory, f"{job}.{ext}")
+            tmp = f"{path}.tmp"
+            with open(tmp, "w") as f:
+                f.write(text)
+            os.replace(tmp, path)
+            paths.append(path)
+        return paths[0], paths[1]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# Process-wide registry every scraper records into
+REGISTRY = Metrics()
@@ -1,7 +1,15 @@
 import argparse
+import hashlib
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
 
 import requests
+import requests.adapters
+
+import metrics
+import profiling
 
 
 REPORT_SPECS = {
@@ -47,47 +55,164 @@ USER_AGENT = (
 )
 
 
-def download_report(
-    report: str,
-    jsessionid: str,
-    session_cookie: str | None = None,
-    output_path: str | None = None,
-) -> str:
-    if report not in REPORT_SPECS:
-        raise ValueError(f"Unsupported report '{report}'. Valid: {', '.join(REPORT_SPECS)}")
+CHUNK_SIZE = 1024 * 1024
+
+
+def _file_digest(path: str) -> str | None:
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                h.update(chunk)
+    except FileNotFoundError:
+        return None
+    return h.hexdigest()
+
+
+def open_session(jsessionid: str, session_cookie: str | None = None) -> requests.Session:
+    """One authenticated session (cookies plus a pooled connection) shared by every report download."""
     if not jsessionid or not isinstance(jsessionid, str):
         raise ValueError("Valid jsessionid is required")
-
-    spec = REPORT_SPECS[report]
-    headers = {
+    session = requests.Session()
+    session.headers.update({
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Referer": spec["referer"],
         "User-Agent": USER_AGENT,
-    }
-    cookies = {"JSESSIONID": jsessionid}
+    })
+    session.cookies.set("JSESSIONID", jsessionid)
     if session_cookie:
-        cookies["session_cookie"] = session_cookie
+        session.cookies.set("session_cookie", session_cookie)
+    return session
 
-    resp = requests.get(spec["url"], headers=headers, cookies=cookies, timeout=120)
-    if resp.status_code != 200:
-        raise RuntimeError(f"{spec['label']} download failed with status {resp.status_code}")
 
+def fetch_report(session: requests.Session, report: str, output_path: str | None = None) -> tuple[str, bool]:
+    """
+    Stream one report to output_path through a temp file and return (path, changed).
+    A download with the same content hash as the file already there is discarded,
+    so the existing file (and its mtime, which downstream caches key on) stays put.
+    """
+    if report not in REPORT_SPECS:
+        raise ValueError(f"Unsupported report '{report}'. Valid: {', '.join(REPORT_SPECS)}")
+    spec = REPORT_SPECS[report]
     if not output_path:
         output_path = os.path.join(os.getcwd(), spec["default_out"])
+    output_path = os.path.abspath(output_path)
 
-    with open(output_path, "wb") as f:
-        f.write(resp.content)
+    tmp = f"{output_path}.part"
+    h = hashlib.sha256()
+    status = None
+    nbytes = 0
+    with metrics.REGISTRY.stage(f"download:{report}"):
+        start = time.perf_counter()
+        try:
+            with session.get(spec["url"], headers={"Referer": spec["referer"]}, stream=True, timeout=120) as resp:
+                status = resp.status_code
+                if resp.status_code != 200:
+                    raise RuntimeError(f"{spec['label']} download failed with status {resp.status_code}")
+                try:
+                    with open(tmp, "wb") as f:
+                        for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+                            h.update(chunk)
+                            f.write(chunk)
+                            nbytes += len(chunk)
+                except BaseException:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+                    raise
+        finally:
+            # the whole transfer counts as the request: these reports are large and streamed
+            metrics.REGISTRY.observe_request(
+                urlsplit(spec["url"]).hostname or "", time.perf_counter() - start, status, nbytes
+            )
 
-    return os.path.abspath(output_path)
+    if h.hexdigest() == _file_digest(output_path):
+        os.remove(tmp)
+        return output_path, False
+    os.replace(tmp, output_path)
+    return output_path, True
 
 
-if __name__ == "__main__":
+def download_report(
+    report: str,
+    jsessionid: str,
+    session_cookie: str | None = None,
+    output_path: str | None = None,
+) -> str:
+    if report not in REPORT_SPECS:
+        raise ValueError(f"Unsupported report '{report}'. Valid: {', '.join(REPORT_SPECS)}")
+    with open_session(jsessionid, session_cookie) as session:
+        path, _ = fetch_report(session, report, output_path)
+    return path
+
+
+def download_reports(
+    reports: list[str],
+    jsessionid: str,
+    session_cookie: str | None = None,
+    out_dir: str | None = None,
+) -> dict[str, tuple[str, bool]]:
+    """
+    Download several reports concurrently on one session into out_dir (default: cwd),
+    each under its default file name. Returns report -> (path, changed); a failed
+    report is raised only after the others have finished.
+    """
+    out_dir = out_dir or os.getcwd()
+    results: dict[str, tuple[str, bool]] = {}
+    errors: dict[str, Exception] = {}
+    with open_session(jsessionid, session_cookie) as session:
+        session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=max(1, len(reports))))
+        with ThreadPoolExecutor(max_workers=max(1, len(reports))) as pool:
+            futures = {
+                pool.submit(fetch_report, session, report, os.path.join(out_dir, REPORT_SPECS[report]["default_out"])): report
+                for report in reports
+            }
+            for future in as_completed(futures):
+                report = futures[future]
+                try:
+                    results[report] = future.result()
+                except (requests.RequestException, RuntimeError, OSError) as ex:
+                    errors[report] = ex
+    if errors:
+        raise RuntimeError("; ".join(f"{REPORT_SPECS[r]['label']}: {ex}" for r, ex in errors.items()))
+    return {report: results[report] for report in reports}
+
+
+def main(argv: list[str] | None = None) -> None:
     parser = argparse.ArgumentParser(description="Download MFT XLS reports using cookies.")
-    parser.add_argument("--report", required=True, choices=sorted(REPORT_SPECS.keys()))
-    parser.add_argument("--jsessionid", required=True, help="JSESSIONID cookie value")
+    parser.add_argument("--report", required=True, choices=sorted(REPORT_SPECS.keys()) + ["all"],
+                        help="Report to download, or 'all' to fetch every report concurrently")
+    parser.add_argument("--jsessionid", default=None,
+                        help="JSESSIONID cookie value (default: the live session stored by login.py)")
     parser.add_argument("--session-cookie", default=None, help="Optional session_cookie value")
-    parser.add_argument("--out", default=None, help="Output XLS path (default depends on report)")
-    args = parser.parse_args()
+    parser.add_argument("--out", default=None,
+                        help="Output XLS path (default depends on report); with --report all, the output directory")
+    parser.add_argument("--metrics-dir", default=metrics.DEFAULT_DIR,
+                        help="Directory for the run's JSON and Prometheus textfile metrics ('' to disable)")
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if not args.jsessionid:
+        from login import get_session
 
-    out = download_report(args.report, args.jsessionid, args.session_cookie, args.out)
-    print(f"✅ Saved file: {out}")
+        args.jsessionid, args.session_cookie = get_session(allow_login=False)
+        if not args.jsessionid:
+            parser.error("no live stored session; pass --jsessionid or run login.py")
+
+    reports = list(REPORT_SPECS) if args.report == "all" else [args.report]
+    try:
+        with profiling.profile_run("download", args.profile, args.profile_alloc):
+            if args.report == "all":
+                saved = download_reports(reports, args.jsessionid, args.session_cookie, args.out)
+            else:
+                with open_session(args.jsessionid, args.session_cookie) as session:
+                    saved = {args.report: fetch_report(session, args.report, args.out)}
+    finally:
+        metrics.REGISTRY.write_reports("download", args.metrics_dir)
+    for report, (out, changed) in saved.items():
+        if changed:
+            print(f"✅ Saved file: {out}")
+        else:
+            print(f"⏭️  {REPORT_SPECS[report]['label']} unchanged since the last download: {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import hashlib
+import heapq
+import math
+import os
+import pickle
+import re
+import sys
+import time
+from typing import Any, Iterable
+
+
+# Matches scoring below this are treated as no match
+MIN_SCORE = 0.8
+NGRAM = 3
+# Grams present in more than this share of names ("fun", "und", "gro") only score
+# candidates found through rarer grams; they never pull in candidates themselves.
+COMMON_GRAM_SHARE = 0.05
+# Names scored in full per lookup, picked by their shared rare grams
+MAX_CANDIDATES = 32
+
+# Spellings used across advisorkhoj slugs, mftools keys and AMFI scheme names
+ABBREVIATIONS = {
+    "reg": "regular",
+    "gr": "growth",
+    "dir": "direct",
+    "opt": "option",
+    "div": "idcw",
+    "dividend": "idcw",
+    "pl": "plan",
+}
+# A name carrying one token of a group never matches a name carrying another one
+EXCLUSIVE_TOKENS = (
+    frozenset({"regular", "direct"}),
+    frozenset({"growth", "idcw", "bonus"}),
+)
+
+SIDECAR_SUFFIX = ".names.pickle"
+SIDECAR_VERSION = 1
+
+
+def name_tokens(name: Any) -> list[str]:
+    text = str(name or "").lower().replace("&", " and ")
+    return [ABBREVIATIONS.get(tok, tok) for tok in re.split(r"[^a-z0-9]+", text) if tok]
+
+
+def _grams(tokens: list[str]) -> frozenset[str]:
+    # spacing drifts ("FLEXICAP" / "Flexi Cap"), so grams run over the joined tokens
+    text = f" {''.join(tokens)} "
+    return frozenset(text[i:i + NGRAM] for i in range(max(1, len(text) - NGRAM + 1)))
+
+
+def _signature(tokens: list[str]) -> tuple[frozenset[str], ...]:
+    toks = set(tokens)
+    numbers = frozenset(t for t in toks if t.isdigit())
+    return (numbers,) + tuple(frozenset(toks & group) for group in EXCLUSIVE_TOKENS)
+
+
+def _compatible(a: tuple[frozenset[str], ...], b: tuple[frozenset[str], ...]) -> bool:
+    if a[0] != b[0]:
+        return False
+    return all(not x or not y or x == y for x, y in zip(a[1:], b[1:]))
+
+
+class NameIndex:
+    """
+    Character n-gram inverted index over a fixed set of scheme names. match()
+    scores only the names sharing a reasonably rare gram with the query
+    (IDF-weighted Dice over trigrams), so a lookup never compares against every
+    name. Results are memoized per query and persist with the sidecar.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self.names = list(dict.fromkeys(str(n) for n in names if n is not None and str(n).strip()))
+        self.fingerprint = fingerprint(self.names)
+        self._grams: list[frozenset[str]] = []
+        self._signatures: list[tuple[frozenset[str], ...]] = []
+        self._postings: dict[str, list[int]] = {}
+        for i, name in enumerate(self.names):
+            tokens = name_tokens(name)
+            grams = _grams(tokens)
+            self._grams.append(grams)
+            self._signatures.append(_signature(tokens))
+            for g in grams:
+                self._postings.setdefault(g, []).append(i)
+        n = max(1, len(self.names))
+        self._idf = {g: math.log(1 + n / len(ids)) for g, ids in self._postings.items()}
+        self._weights = [sum(self._idf[g] for g in grams) for grams in self._grams]
+        self._common_df = max(2, int(n * COMMON_GRAM_SHARE))
+        self._memo: dict[str, tuple[str, float] | None] = {}
+        self.dirty = False
+
+    def _best(self, query: str) -> tuple[str, float] | None:
+        tokens = name_tokens(query)
+        if not tokens:
+            return None
+        grams = _grams(tokens)
+        known = [g for g in grams if g in self._postings]
+        seeds = [g for g in known if len(self._postings[g]) <= self._common_df] or known
+        # rank by the weight of shared rare grams first; only the leaders get a full score
+        seed_weight: dict[int, float] = {}
+        for g in seeds:
+            w = self._idf[g]
+            for i in self._postings[g]:
+                seed_weight[i] = seed_weight.get(i, 0.0) + w
+        if not seed_weight:
+            return None
+        candidates = heapq.nlargest(MAX_CANDIDATES, seed_weight, key=seed_weight.__getitem__)
+
+        signature = _signature(tokens)
+        # grams unknown to the index still count towards the query's weight
+        q_weight = sum(self._idf.get(g, math.log(1 + len(self.names))) for g in grams)
+        best, best_score = None, 0.0
+        for i in candidates:
+            if not _compatible(signature, self._signatures[i]):
+                continue
+            shared = sum(self._idf[g] for g in grams & self._grams[i])
+            score = 2 * shared / (q_weight + self._weights[i])
+            if score > best_score:
+                best, best_score = i, score
+        if best is None:
+            return None
+        return self.names[best], round(best_score, 4)
+
+    def match(self, query: Any, min_score: float = MIN_SCORE) -> tuple[str, float] | None:
+        """Best (name, score) for query, or None when nothing scores at least min_score."""
+        key = str(query or "").strip()
+        if key in self._memo:
+            result = self._memo[key]
+        else:
+            result = self._best(key)
+            self._memo[key] = result
+            self.dirty = True
+        if result is None or result[1] < min_score:
+            return None
+        return result
+
+
+def fingerprint(names: Iterable[str]) -> str:
+    h = hashlib.sha256()
+    for name in names:
+        h.update(name.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def load_name_index(names: Iterable[str], sidecar: str) -> NameIndex:
+    """
+    Return the index for names, reusing the sidecar (and the matches memoized in
+    it) when it was built from the same names.
+    """
+    names = list(dict.fromkeys(str(n) for n in names if n is not None and str(n).strip()))
+    try:
+        with open(sidecar, "rb") as f:
+            payload = pickle.load(f)
+        if (
+            isinstance(payload, dict)
+            and payload.get("version") == SIDECAR_VERSION
+            and payload["index"].fingerprint == fingerprint(names)
+        ):
+            index = payload["index"]
+            index.dirty = False
+            return index
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError, KeyError):
+        pass
+    index = NameIndex(names)
+    index.dirty = True
+    return index
+
+
+def save_name_index(index: NameIndex, sidecar: str) -> None:
+    """Persist the index and its memoized matches if anything changed."""
+    if not index.dirty:
+        return
+    tmp = f"{sidecar}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump({"version": SIDECAR_VERSION, "index": index}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, sidecar)
+        index.dirty = False
+    except OSError as ex:
+        print(f"Could not write name index {sidecar}: {ex}")
+
+
+if __name__ == "__main__":
+    # Lookup check against the AMFI names in scheme_list.json: python namematch.py "sbi contra reg gr"
+    import json
+
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "scheme_list.json")) as f:
+        schemes = json.load(f)["scheme_list"]
+    start = time.perf_counter()
+    index = NameIndex(s["scheme_amfi"] for s in schemes)
+    build_ms = (time.perf_counter() - start) * 1000
+    queries = sys.argv[1:] or [s["scheme_amfi"].upper().replace(" - ", " ") for s in schemes[:200]]
+    start = time.perf_counter()
+    results = [index._best(q) for q in queries]
+    lookup_us = (time.perf_counter() - start) / len(queries) * 1e6
+    for q, r in list(zip(queries, results))[:10]:
+        print(f"{q!r} -> {r}")
+    print(f"{len(index.names)} names indexed in {build_ms:.1f} ms; {lookup_us:.0f} µs per uncached lookup")
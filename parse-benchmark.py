@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+from akparser import BACKENDS, lxml_html, parse_fund_page
+from growwstats import parse_groww_stats
+from screenerparser import BACKENDS as SCREENER_BACKENDS, parse_screener_page
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(SCRIPT_DIR, "fixtures")
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def build_cases():
+    """Offline extraction paths, each a (name, callable taking no arguments) pair."""
+    ak_page = _read(os.path.join(SCRIPT_DIR, "response-dump.html"))
+    groww_body = _read(os.path.join(FIXTURE_DIR, "groww-stats.json"))
+    screener_page = _read(os.path.join(FIXTURE_DIR, "screener-company.html")).decode("utf-8")
+
+    cases = []
+    for backend in BACKENDS:
+        if backend == "lxml" and lxml_html is None:
+            continue
+        cases.append((f"advisorkhoj-{backend}", lambda b=backend: parse_fund_page(ak_page, b)))
+    cases.append(("groww-stats", lambda: parse_groww_stats(groww_body)))
+    for backend in SCREENER_BACKENDS:
+        if backend == "lxml" and lxml_html is None:
+            continue
+        cases.append((f"screener-{backend}", lambda b=backend: parse_screener_page(screener_page, "TCS", backend=b)))
+    return cases
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def run_case(fn, iterations, warmup):
+    for _ in range(warmup):
+        fn()
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    # Peak memory is measured on a separate call so tracemalloc doesn't skew the timings.
+    # tracemalloc only sees Python allocations, so libxml2's tree behind lxml is not counted.
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "pages_per_sec": iterations / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "peak_mem_kb": peak / 1024,
+    }
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPT_DIR,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(results, baseline=None):
+    print(f"{'case':<20} {'pages/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'peak KB':>10}")
+    for name, r in results.items():
+        line = f"{name:<20} {r['pages_per_sec']:>10.1f} {r['p50_ms']:>9.3f} {r['p99_ms']:>9.3f} {r['peak_mem_kb']:>10.1f}"
+        prev = (baseline or {}).get(name)
+        if prev and prev.get("pages_per_sec"):
+            change = (r["pages_per_sec"] / prev["pages_per_sec"] - 1) * 100
+            line += f"   {change:+.1f}% pages/s vs baseline"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline parse benchmark over local fixtures (no network)")
+    parser.add_argument("--iterations", type=int, default=50, help="Timed parses per case")
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed parses per case before measuring")
+    parser.add_argument("--case", action="append", default=[], help="Only run the named case (repeatable)")
+    parser.add_argument("--out-dir", default=os.path.join(SCRIPT_DIR, "benchmark-results"), help="Directory for the JSON results file")
+    parser.add_argument("--compare", default=None, help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    results = {}
+    for name, fn in build_cases():
+        if args.case and name not in args.case:
+            continue
+        results[name] = run_case(fn, args.iterations, args.warmup)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f).get("results")
+    print_report(results, baseline)
+
+    commit = _git_commit()
+    payload = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    os.makedirs(args.out_dir, exist_ok=True)
+    out_path = os.path.join(args.out_dir, f"parse_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}_{commit}.json")
+    with open(out_path, "w") as f:
+        json.dump(payload, f, indent=2)
+    print(f"✅ Results saved to: {out_path}")
@@ -0,0 +1,274 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from metrics import REGISTRY
+
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+# 5 ms between samples keeps the sampler to a few percent of one core
+DEFAULT_INTERVAL = 0.005
+# tracemalloc cost grows with the frames kept per allocation; one frame is enough to name the line
+ALLOC_FRAMES = 1
+MAX_DEPTH = 64
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 15
+
+UNATTRIBUTED = "(no stage)"
+
+
+def _stop_tracing_in_child() -> None:
+    # forked workers (the parser pool) inherit tracemalloc, which would slow every parse they do
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_stop_tracing_in_child)
+
+
+def _frame_label(code: Any) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _StageProfile:
+    __slots__ = ("samples", "stacks", "seconds", "peak", "overlapped", "allocations")
+
+    def __init__(self) -> None:
+        self.samples = 0
+        self.stacks: dict[tuple[Any, ...], int] = {}
+        self.seconds = 0.0
+        self.peak = 0
+        # ran at least once alongside a stage in another thread, where no peak of its own exists
+        self.overlapped = False
+        self.allocations: list[Any] = []
+
+
+class _ActiveStage:
+    __slots__ = ("name", "solo")
+
+    def __init__(self, name: str, solo: bool):
+        self.name = name
+        # no other stage ran anywhere since this one reset the traced-memory peak
+        self.solo = solo
+
+
+class Profiler:
+    """
+    Low-overhead profiling for a whole run. A daemon thread samples every
+    thread's Python stack at a fixed interval and charges each sample to the
+    stage that thread is in (stages are the metrics.REGISTRY.stage blocks and
+    StageGraph stages); tracemalloc snapshots at each stage's start and end
+    give its net allocations by line (opt-in, it costs far more than sampling).
+    tracemalloc has one process-wide peak, so a stage's peak is only reported
+    when no stage ran in another thread at the same time. Samples are
+    wall-clock, so time a stage spends waiting on the network shows up in
+    selector/socket frames. Worker processes (the advisorkhoj parser pool) are
+    not sampled; their parse time is in the metrics report instead.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, trace_allocations: bool = False):
+        self.interval = interval
+        self.trace_allocations = trace_allocations
+        self._profiles: dict[str, _StageProfile] = {}
+        self._active: dict[int, list[_ActiveStage]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._started_tracing = False
+        self.sampling_seconds = 0.0
+        self.started = 0.0
+
+    def start(self) -> "Profiler":
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start(ALLOC_FRAMES)
+            self._started_tracing = True
+        REGISTRY.stage_hooks.append(self.stage)
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.stage in REGISTRY.stage_hooks:
+            REGISTRY.stage_hooks.remove(self.stage)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _profile(self, name: str) -> _StageProfile:
+        profile = self._profiles.get(name)
+        if profile is None:
+            profile = self._profiles[name] = _StageProfile()
+        return profile
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        tid = threading.get_ident()
+        tracing = tracemalloc.is_tracing()
+        # snapshots are taken outside the stage so their own cost isn't charged to it;
+        # stages overlapping in other threads share them, so their allocations can mix
+        snapshot = tracemalloc.take_snapshot() if tracing else None
+        with self._lock:
+            profile = self._profile(name)
+            # the peak is only reset (and so only meaningful) when nothing else is running;
+            # a stage nested in this thread's stage is part of the outer one's peak
+            active = _ActiveStage(name, solo=not self._active)
+            for other_tid, stack in self._active.items():
+                if other_tid != tid:
+                    for other in stack:
+                        other.solo = False
+            self._active.setdefault(tid, []).append(active)
+            if tracing and active.solo:
+                tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                stack = self._active.get(tid)
+                if stack:
+                    stack.pop()
+                    if not stack:
+                        del self._active[tid]
+            allocations = []
+            peak = 0
+            if tracing and tracemalloc.is_tracing():
+                with self._lock:
+                    peak = tracemalloc.get_traced_memory()[1] if active.solo else 0
+                allocations = tracemalloc.take_snapshot().compare_to(snapshot, "lineno")[:TOP_ALLOCATIONS]
+            with self._lock:
+                profile.seconds += elapsed
+                profile.peak = max(profile.peak, peak)
+                profile.overlapped = profile.overlapped or (tracing and not active.solo)
+                profile.allocations = allocations or profile.allocations
+
+    def _sample_loop(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            t0 = time.perf_counter()
+            frames = sys._current_frames()
+            with self._lock:
+                for tid, frame in frames.items():
+                    if tid == own:
+                        continue
+                    stack = []
+                    while frame is not None and len(stack) < MAX_DEPTH:
+                        stack.append(frame.f_code)
+                        frame = frame.f_back
+                    active = self._active.get(tid)
+                    profile = self._profile(active[-1].name if active else UNATTRIBUTED)
+                    key = tuple(reversed(stack))
+                    profile.stacks[key] = profile.stacks.get(key, 0) + 1
+                    profile.samples += 1
+            self.sampling_seconds += time.perf_counter() - t0
+
+    def hot_functions(self, name: str) -> list[tuple[str, int, int]]:
+        """(function, self samples, total samples) for a stage, hottest self time first."""
+        profile = self._profiles[name]
+        own: dict[Any, int] = {}
+        total: dict[Any, int] = {}
+        for stack, n in profile.stacks.items():
+            if not stack:
+                continue
+            own[stack[-1]] = own.get(stack[-1], 0) + n
+            for code in set(stack):
+                total[code] = total.get(code, 0) + n
+        ranked = sorted(total, key=lambda code: (own.get(code, 0), total[code]), reverse=True)
+        return [(_frame_label(code), own.get(code, 0), total[code]) for code in ranked]
+
+    def collapsed(self, name: str) -> list[str]:
+        """Stacks in the collapsed format read by flamegraph.pl, speedscope and inferno."""
+        lines = []
+        for stack, n in sorted(self._profiles[name].stacks.items(), key=lambda kv: -kv[1]):
+            frames = ";".join(_frame_label(code).replace(";", ":") for code in stack)
+            lines.append(f"{frames} {n}")
+        return lines
+
+    def report(self, name: str) -> str:
+        profile = self._profiles[name]
+        samples = max(1, profile.samples)
+        lines = [
+            f"Stage '{name}': {profile.samples} samples every {self.interval * 1000:.0f} ms"
+            + (f" over {profile.seconds:.2f} s" if profile.seconds else "")
+            + (f"; peak traced memory {profile.peak / 1024 / 1024:.1f} MiB" if profile.peak else "")
+            + ("; no peak for runs alongside other stages" if profile.overlapped else ""),
+            "",
+            f"{'self %':>7} {'total %':>8}  function",
+        ]
+        for label, own, total in self.hot_functions(name)[:TOP_FUNCTIONS]:
+            lines.append(f"{own / samples * 100:>7.1f} {total / samples * 100:>8.1f}  {label}")
+        if profile.allocations:
+            lines += ["", "Net allocations over the stage, by line:"]
+            for stat in profile.allocations:
+                frame = stat.traceback[0]
+                lines.append(
+                    f"{stat.size_diff / 1024:>+10.1f} KiB {stat.count_diff:>+8} blocks  "
+                    f"{os.path.basename(frame.filename)}:{frame.lineno}"
+                )
+        return "\n".join(lines) + "\n"
+
+    def write(self, job: str, directory: str = DEFAULT_DIR) -> list[str]:
+        """
+        Write '<job>.<stage>.txt' (ranked hot functions and allocations) and
+        '<job>.<stage>.collapsed' (flamegraph stacks) for every stage sampled.
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        with self._lock:
+            names = [n for n, p in self._profiles.items() if p.samples or p.seconds]
+        for name in names:
+            base = os.path.join(directory, f"{job}.{name.replace(os.sep, '_').replace(':', '_')}")
+            for path, text in (
+                (f"{base}.txt", self.report(name)),
+                (f"{base}.collapsed", "\n".join(self.collapsed(name)) + "\n"),
+            ):
+                with open(path, "w") as f:
+                    f.write(text)
+                paths.append(path)
+        wall = time.perf_counter() - self.started
+        print(
+            f"Profiles for {len(names)} stages written to {directory} "
+            f"(sampler used {self.sampling_seconds / wall * 100 if wall else 0:.1f}% of the run)"
+        )
+        return paths
+
+
+@contextmanager
+def profile_run(job: str, directory: str | None, trace_allocations: bool = False) -> Iterator[Profiler | None]:
+    """Profile the enclosed run into directory, or do nothing when directory is None."""
+    if not directory:
+        yield None
+        return
+    profiler = Profiler(trace_allocations=trace_allocations).start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        profiler.write(job, directory)
+
+
+def add_profile_arguments(parser: Any) -> None:
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=DEFAULT_DIR,
+        default=None,
+        metavar="DIR",
+        help=f"Sample every stage's stacks and allocations; writes ranked reports and flamegraph stacks to DIR (default {DEFAULT_DIR})",
+    )
+    parser.add_argument(
+        "--profile-alloc",
+        dest="profile_alloc",
+        action="store_true",
+        help="With --profile, also trace allocations per stage; stack sampling alone costs a few percent of a run, tracemalloc up to a third of its CPU time",
+    )
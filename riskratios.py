@@ -0,0 +1,160 @@
+import hashlib
+import os
+import pickle
+import sys
+import time
+from typing import Any, Iterator
+
+
+REQUIRED_METRICS = ["Volatility", "Sharpe Ratio", "Beta", "Alpha", "Mean", "Sortino Ratio", "Up Market Capture\nRatio", "Down Market Capture\nRatio", "Maximum Drawdown", "R-Squared", "Information Ratio"]
+
+# Row cues used to autodetect the header row, per workbook format
+HEADER_CUES = {
+    ".xls": ("scheme name", "category"),
+    ".xlsx": ("volatility", "sharpe"),
+}
+HEADER_SCAN_ROWS = 200
+
+SIDECAR_SUFFIX = ".parsed.pickle"
+SIDECAR_VERSION = 1
+
+
+def _iter_rows(path: str) -> Iterator[list[Any]]:
+    # Spreadsheet libraries are imported here so a sidecar hit never pays for them.
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".xls":
+        import xlrd
+
+        sh = xlrd.open_workbook(path).sheet_by_index(0)
+        for r in range(sh.nrows):
+            yield sh.row_values(r)
+    else:
+        from openpyxl import load_workbook
+
+        wb = load_workbook(filename=path, data_only=True, read_only=True)
+        for row in wb.active.iter_rows(values_only=True):
+            yield list(row) if row else []
+
+
+def _header_index(headers: list[str]) -> dict[str, int]:
+    # fuzzy header match: either string may contain the other
+    lower_headers = [h.lower() for h in headers]
+    h_idx = {}
+    for k in REQUIRED_METRICS:
+        lk = k.lower()
+        for i, hv in enumerate(lower_headers):
+            if lk in hv or hv in lk:
+                h_idx[k] = i
+                break
+    return h_idx
+
+
+def parse_risk_ratios(path: str) -> dict[str, dict[str, Any]]:
+    """Read the risk ratios workbook into {mftools scheme name: {metric: value}}."""
+    ext = os.path.splitext(path)[1].lower()
+    cues = HEADER_CUES.get(ext, HEADER_CUES[".xlsx"])
+    rows = _iter_rows(path)
+
+    # buffer the first rows to locate the header row, then continue with the iterator
+    buffered = []
+    for row in rows:
+        buffered.append(row)
+        if len(buffered) >= HEADER_SCAN_ROWS:
+            break
+    header_row_idx = 0
+    for i, row in enumerate(buffered):
+        joined = " ".join((str(v).strip().lower() if v is not None else "") for v in row)
+        if all(cue in joined for cue in cues):
+            header_row_idx = i
+            break
+    header_row = buffered[header_row_idx] if buffered else []
+    h_idx = _header_index([str(h).strip() if h is not None else "" for h in header_row])
+
+    table: dict[str, dict[str, Any]] = {}
+    for source in (buffered[header_row_idx + 1:], rows):
+        for r in source:
+            if not r:
+                continue
+            key = r[0]
+            if key is None or str(key).strip() == "":
+                continue
+            metrics = {}
+            for k, idx in h_idx.items():
+                if idx < len(r):
+                    metrics[k] = r[idx]
+            table[str(key).strip()] = metrics
+    return table
+
+
+def _file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _read_sidecar(sidecar: str) -> dict[str, Any] | None:
+    try:
+        with open(sidecar, "rb") as f:
+            payload = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+    if not isinstance(payload, dict) or payload.get("version") != SIDECAR_VERSION:
+        return None
+    return payload
+
+
+def _write_sidecar(sidecar: str, payload: dict[str, Any]) -> None:
+    tmp = f"{sidecar}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, sidecar)
+    except OSError as ex:
+        print(f"Could not write risk ratios cache {sidecar}: {ex}")
+
+
+def load_risk_ratios(path: str) -> dict[str, dict[str, Any]]:
+    """
+    Return the parsed risk ratios table, reusing the '<path>.parsed.pickle' sidecar
+    when the workbook is unchanged. Size and mtime are checked first; if only the
+    mtime moved (e.g. the same report downloaded again) the content hash decides.
+    """
+    st = os.stat(path)
+    sidecar = path + SIDECAR_SUFFIX
+    cached = _read_sidecar(sidecar)
+    if cached is not None and cached["size"] == st.st_size:
+        if cached["mtime_ns"] == st.st_mtime_ns:
+            return cached["table"]
+        digest = _file_digest(path)
+        if cached["sha256"] == digest:
+            cached["mtime_ns"] = st.st_mtime_ns
+            _write_sidecar(sidecar, cached)
+            return cached["table"]
+    else:
+        digest = _file_digest(path)
+
+    table = parse_risk_ratios(path)
+    _write_sidecar(sidecar, {
+        "version": SIDECAR_VERSION,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha256": digest,
+        "table": table,
+    })
+    return table
+
+
+if __name__ == "__main__":
+    # Timing check: python riskratios.py risk-ratios.xls
+    path = sys.argv[1] if len(sys.argv) > 1 else "risk-ratios.xls"
+    start = time.perf_counter()
+    table = parse_risk_ratios(path)
+    parse_ms = (time.perf_counter() - start) * 1000
+    load_risk_ratios(path)
+    start = time.perf_counter()
+    cached = load_risk_ratios(path)
+    load_ms = (time.perf_counter() - start) * 1000
+    assert cached == table
+    print(f"{len(table)} schemes: {parse_ms:.1f} ms parsing the workbook, {load_ms:.1f} ms from {path}{SIDECAR_SUFFIX}")
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from typing import Any
+
+
+DEFAULT_SCHEME_LIST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scheme_list.json")
+INDEX_SUFFIX = ".sqlite3"
+# Bump when the table layout changes so existing indexes are rebuilt
+INDEX_VERSION = "1"
+
+_SCHEMA = """
+CREATE TABLE schemes (
+    amfi_code TEXT PRIMARY KEY,
+    isin TEXT,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    company TEXT,
+    category TEXT
+);
+CREATE INDEX schemes_isin ON schemes (isin);
+CREATE INDEX schemes_name_key ON schemes (name_key);
+CREATE INDEX schemes_company_category ON schemes (company, category);
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+_COLUMNS = "amfi_code, isin, name, company, category"
+
+
+def name_key(name: Any) -> str:
+    """Normalized scheme name used for exact name lookups."""
+    text = str(name or "").strip().lower().replace("&", " and ")
+    return re.sub(r"[^a-z0-9]+", "", text)
+
+
+def _file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _row_dict(row: tuple | None) -> dict[str, Any] | None:
+    if row is None:
+        return None
+    amfi_code, isin, name, company, category = row
+    return {"amfi_code": amfi_code, "isin": isin, "name": name, "company": company, "category": category}
+
+
+class SchemeMaster:
+    """Indexed lookups over the AMFI scheme list by code, ISIN, name and company/category."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path)
+
+    def _one(self, where: str, value: str) -> dict[str, Any] | None:
+        return _row_dict(self._conn.execute(f"SELECT {_COLUMNS} FROM schemes WHERE {where} = ? LIMIT 1", (value,)).fetchone())
+
+    def by_amfi_code(self, amfi_code: Any) -> dict[str, Any] | None:
+        return self._one("amfi_code", str(amfi_code).strip())
+
+    def by_isin(self, isin: str) -> dict[str, Any] | None:
+        isin = str(isin or "").strip().upper()
+        return self._one("isin", isin) if isin else None
+
+    def by_name(self, name: Any) -> dict[str, Any] | None:
+        """The scheme with this normalized name; None when absent or when several schemes share it."""
+        key = name_key(name)
+        if not key:
+            return None
+        rows = self._conn.execute(f"SELECT {_COLUMNS} FROM schemes WHERE name_key = ? LIMIT 2", (key,)).fetchall()
+        return _row_dict(rows[0]) if len(rows) == 1 else None
+
+    def by_company_category(self, company: str, category: str | None = None) -> list[dict[str, Any]]:
+        if category is None:
+            rows = self._conn.execute(f"SELECT {_COLUMNS} FROM schemes WHERE company = ?", (company,))
+        else:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM schemes WHERE company = ? AND category = ?", (company, category)
+            )
+        return [_row_dict(row) for row in rows]
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM schemes").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _read_meta(db_path: str) -> dict[str, str]:
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return {}
+
+
+def build_scheme_master(json_path: str, db_path: str, digest: str | None = None) -> None:
+    """Compile scheme_list.json into a fresh SQLite index, swapped into place atomically."""
+    st = os.stat(json_path)
+    with open(json_path, "r") as f:
+        schemes = json.load(f).get("scheme_list", [])
+    tmp = f"{db_path}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.executescript(_SCHEMA)
+        conn.executemany(
+            "INSERT OR REPLACE INTO schemes (amfi_code, isin, name, name_key, company, category) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    str(s.get("scheme_amfi_code") or "").strip(),
+                    str(s.get("scheme_isin") or "").strip().upper() or None,
+                    s.get("scheme_amfi") or "",
+                    name_key(s.get("scheme_amfi")),
+                    s.get("scheme_company"),
+                    s.get("scheme_advisorkhoj_category"),
+                )
+                for s in schemes
+                if str(s.get("scheme_amfi_code") or "").strip()
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO meta (key, value) VALUES (?, ?)",
+            [
+                ("version", INDEX_VERSION),
+                ("size", str(st.st_size)),
+                ("mtime_ns", str(st.st_mtime_ns)),
+                ("sha256", digest or _file_digest(json_path)),
+            ],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, db_path)
+
+
+def open_scheme_master(json_path: str = DEFAULT_SCHEME_LIST, db_path: str | None = None) -> SchemeMaster:
+    """
+    Open the compiled index for json_path ('<json_path>.sqlite3' by default),
+    rebuilding it only when the JSON changed: size and mtime are checked first,
+    and if only the mtime moved the content hash decides.
+    """
+    db_path = db_path or json_path + INDEX_SUFFIX
+    st = os.stat(json_path)
+    meta = _read_meta(db_path)
+    digest = None
+    if meta.get("version") == INDEX_VERSION and meta.get("size") == str(st.st_size):
+        if meta.get("mtime_ns") == str(st.st_mtime_ns):
+            return SchemeMaster(db_path)
+        digest = _file_digest(json_path)
+        if meta.get("sha256") == digest:
+            conn = sqlite3.connect(db_path)
+            with conn:
+                conn.execute("UPDATE meta SET value = ? WHERE key = 'mtime_ns'", (str(st.st_mtime_ns),))
+            conn.close()
+            return SchemeMaster(db_path)
+    build_scheme_master(json_path, db_path, digest)
+    return SchemeMaster(db_path)
+
+
+if __name__ == "__main__":
+    # Timing check: python schememaster.py [scheme_list.json]
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SCHEME_LIST
+    start = time.perf_counter()
+    with open(path) as f:
+        schemes = json.load(f)["scheme_list"]
+    json_ms = (time.perf_counter() - start) * 1000
+    build_scheme_master(path, path + INDEX_SUFFIX)
+    start = time.perf_counter()
+    master = open_scheme_master(path)
+    open_ms = (time.perf_counter() - start) * 1000
+    sample = schemes[len(schemes) // 2]
+    start = time.perf_counter()
+    for _ in range(1000):
+        master.by_amfi_code(sample["scheme_amfi_code"])
+        master.by_isin(sample["scheme_isin"])
+        master.by_name(sample["scheme_amfi"])
+    lookup_us = (time.perf_counter() - start) / 3000 * 1e6
+    assert master.by_name(sample["scheme_amfi"])["amfi_code"] == sample["scheme_amfi_code"]
+    print(
+        f"{len(master)} schemes: {json_ms:.1f} ms parsing {os.path.basename(path)}, "
+        f"{open_ms:.1f} ms opening the index, {lookup_us:.1f} µs per lookup"
+    )
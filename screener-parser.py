@@ -1,92 +1,58 @@
-import concurrent.futures
+import argparse
+import asyncio
 import csv
 import re
-import requests
-import yaml
 import html
+import time
 from datetime import datetime
-from bs4 import BeautifulSoup
 
-def get_stock_prices(tickers):
-    trendDetails = list()
-    futures=list()
+import metrics
+import profiling
+
+from asyncfetcher import AsyncFetcher, fetch_errors
+from screenerparser import parse_screener_page
+
+def get_stock_prices(tickers, controller=None):
+    return asyncio.run(_get_stock_prices(tickers, controller))
+
+async def _get_stock_prices(tickers, controller=None):
     print(tickers)
-      
-    # Number of processes in the process pool
-    num_processes = 100  # You can adjust this based on your system resources
-    # Using ProcessPoolExecutor for parallel execution
-    with concurrent.futures.ProcessPoolExecutor(max_workers=num_processes) as executor:
-      # Submit tasks and get Future objects
-      for count in range(len(tickers)):
-        ticker=tickers[count]
-        print(count+1, ticker)
-        futures.append(executor.submit(get_stock_info, ticker))
-          
-      # Wait for all futures to complete
-      concurrent.futures.wait(futures)
-
-      # Retrieve results from completed futures
-      for future in futures:
-        valueDict=future.result()
-        if bool(valueDict):
-          trendDetails.append(valueDict)
-      
-    return trendDetails
-
-def get_stock_info(symbol):
+    results = [None] * len(tickers)
+    pending = iter(enumerate(tickers))
+
+    # One process, one pooled session; the controller adapts how many requests screener.in gets at once
+    async with AsyncFetcher(controller=controller) as fetcher:
+        async def worker():
+            for count, ticker in pending:
+                print(count+1, ticker)
+                results[count] = await get_stock_info(fetcher, ticker)
+
+        # a fixed set of workers pulls tickers, so a long list never piles up pending coroutines
+        workers = min(fetcher.controller.max_workers("www.screener.in"), len(tickers))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+    return [valueDict for valueDict in results if bool(valueDict)]
+
+async def get_stock_info(fetcher, symbol):
      
     base_url = "https://www.screener.in/company/"
     url = f"{base_url}{symbol}/#peers"
   
     print(url)
-    response = requests.get(url)
+    try:
+        response = await fetcher.get(url)
+    except fetch_errors() as ex:
+        print(f"\033[91mFailed for {url}: {ex}\033[0m")
+        return None
     # to dump html for testing purposes
     # f = open("response-dump.html", "a")
     # f.write(response.text)
     # f.close()
 
-    fields = ['Market Cap', 'Current Price', 'Book Value', 'Face Value', 'Stock P/E', 'ROE', 'DMA 50', '3 Years', '5 Years', '10 Years', 'TTM']  
-    if response.status_code == 200:
-        # Parse the HTML content or use BeautifulSoup to extract information
-        # For example, you can use BeautifulSoup to extract the stock price
-        # (similar to the previous examples)
-
-        valueDict = {}
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-        print(soup)
-
-        # Find all <li> tags under #top-ratios
-        ratios = soup.select('#top-ratios li')
-        #print(ratios)
-
-        market_cap = None
-
-        extracted_data = {}
-        extracted_data['ticker']=symbol
-
-        for ratio in ratios:
-          name_tag = ratio.find('span', class_='name')
-          value_tag = ratio.find('span', class_='nowrap value')
-          if name_tag and value_tag:
-            name = name_tag.get_text(strip=True)
-            if name in fields:
-                number_tag = value_tag.find('span', class_='number')
-                number = number_tag.get_text(strip=True) if number_tag else ''
-                suffix = value_tag.get_text(strip=True).split(number, 1)[-1].strip()
-                extracted_data[name] = f"{number} {suffix}".strip()
-
-        for table in soup.select('table.ranges-table'):
-            header = table.find('th').text.strip()  # e.g. "Compounded Sales Growth, Stock Price CAGR ..."
-            if header == 'Stock Price CAGR':
-
-              for row in table.find_all('tr')[1:]:  # Skip the header row
-                cols = row.find_all('td')
-                if len(cols) == 2:
-                    label = cols[0].text.strip().replace(':', '')  # e.g. "5 Years"
-                    value = cols[1].text.strip()  # e.g. "10%"
-                    if label in fields:
-                        extracted_data[label] = value     
+    if response.status == 200:
+        start = time.perf_counter()
+        extracted_data = parse_screener_page(response.text, symbol)
+        metrics.REGISTRY.observe_parse("screener", time.perf_counter() - start)
 
         if bool(extracted_data):
           return extracted_data
@@ -98,6 +64,8 @@ def get_stock_info(symbol):
 # tickers:
 # - TCS
 def extract_data_from_yaml(property):
+  import yaml
+
   with open('tickers.yaml', 'r') as file:
       data = yaml.safe_load(file)
 
@@ -141,13 +109,24 @@ def export_to_file(data):
     writer.writeheader()
     writer.writerows(formatted_data)
 
-if __name__ == "__main__":
-    
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Scrape screener.in ratios for the tickers in tickers.yaml")
+  parser.add_argument("--metrics-dir", default=metrics.DEFAULT_DIR, help="Directory for the run's JSON and Prometheus textfile metrics ('' to disable)")
+  profiling.add_profile_arguments(parser)
+  args = parser.parse_args(argv)
+
   # extract ticker names
   tickers = extract_data_from_yaml('tickers')
 
   # extract data for funds
-  extracted_data = get_stock_prices(tickers)
+  try:
+    with profiling.profile_run("screener", args.profile, args.profile_alloc), metrics.REGISTRY.stage("scrape"):
+      extracted_data = get_stock_prices(tickers)
+  finally:
+    metrics.REGISTRY.write_reports("screener", args.metrics_dir)
   print(extracted_data)
   #export_to_file(extracted_data)
   print(extracted_data)
+
+if __name__ == "__main__":
+  main()
@@ -1,3 +1,5 @@
+import argparse
+import asyncio
 import concurrent.futures
 import csv
 import re
@@ -5,19 +7,65 @@ import requests
 import yaml
 import html
 import time
-from selenium import webdriver
 from datetime import datetime
 from bs4 import BeautifulSoup
 
+from browserpool import DEFAULT_BROWSERS, DEFAULT_PAGES_PER_BROWSER
+from concurrency import ConcurrencyController
+from screenerparser import parse_screener_page
+
+# Adaptive per-host limits shared by every worker thread
+CONTROLLER = ConcurrencyController()
+
+TOP_RATIO_FIELDS = ['Market Cap', 'Current Price', 'Book Value', 'Face Value', 'Stock P/E', 'ROE', 'DMA 50']
+
+def get_stock_prices_pooled(tickers, browsers=DEFAULT_BROWSERS, pages_per_browser=DEFAULT_PAGES_PER_BROWSER):
+    return asyncio.run(_get_stock_prices_pooled(tickers, browsers, pages_per_browser))
+
+async def _get_stock_prices_pooled(tickers, browsers, pages_per_browser):
+    from browserpool import BrowserPool
+
+    print(tickers)
+    results = [None] * len(tickers)
+    pending = iter(enumerate(tickers))
+
+    # Browsers start once; every ticker borrows one of their already-open pages
+    async with BrowserPool(browsers, pages_per_browser, CONTROLLER) as pool:
+        async def worker():
+            for count, ticker in pending:
+                print(count+1, ticker)
+                results[count] = await render_stock_info(pool, ticker)
+
+        await asyncio.gather(*(worker() for _ in range(min(pool.size, len(tickers)))))
+    print(pool.report())
+
+    return [valueDict for valueDict in results if bool(valueDict)]
+
+async def render_stock_info(pool, symbol):
+    base_url = "https://www.screener.in/company/"
+    url = f"{base_url}{symbol}/consolidated"
+
+    print(url)
+    try:
+        # returns as soon as the ratios are rendered instead of after a fixed sleep
+        html = await pool.render(url, "#top-ratios")
+    except Exception as ex:
+        print(f"\033[91mFailed for {url}: {ex}\033[0m")
+        return None
+
+    extracted_data = parse_screener_page(html, symbol, TOP_RATIO_FIELDS)
+    if len(extracted_data) > 1:
+        return extracted_data
+    print(f"\033[91m{symbol} has no data\033[0m")
+
 def get_stock_prices(tickers):
     trendDetails = list()
     futures=list()
     print(tickers)
       
-    # Number of processes in the process pool
-    num_processes = 100  # You can adjust this based on your system resources
-    # Using ProcessPoolExecutor for parallel execution
-    with concurrent.futures.ProcessPoolExecutor(max_workers=num_processes) as executor:
+    # Threads share CONTROLLER, which grows/shrinks the in-flight limit for screener.in
+    max_workers = max(1, min(CONTROLLER.max_workers("www.screener.in"), len(tickers)))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
       # Submit tasks and get Future objects
       for count in range(len(tickers)):
         ticker=tickers[count]
@@ -48,13 +96,16 @@ def get_stock_info(symbol):
     # f.close()
 
 
-    # Setup Selenium with headless Chrome
+    # Setup Selenium with headless Chrome (only the --selenium path needs it)
+    from selenium import webdriver
+
     options = webdriver.ChromeOptions()
     options.add_argument('--headless')
     driver = webdriver.Chrome(options=options)
 
     # Go to the page
-    driver.get(url)
+    with CONTROLLER.slot(url):
+        driver.get(url)
     time.sleep(1)  # Wait for JS to load
 
     # Get page source *after* JavaScript runs
@@ -109,11 +160,19 @@ def extract_data_from_yaml(property):
 
 
 if __name__ == "__main__":
-    
+  parser = argparse.ArgumentParser(description="Render screener.in company pages in headless browsers")
+  parser.add_argument("--browsers", type=int, default=DEFAULT_BROWSERS, help="Long-lived headless browsers in the pool")
+  parser.add_argument("--pages-per-browser", type=int, default=DEFAULT_PAGES_PER_BROWSER, help="Concurrent pages kept open in each browser")
+  parser.add_argument("--selenium", action="store_true", help="Use the old one-Chrome-per-ticker Selenium path")
+  args = parser.parse_args()
+
   # extract ticker names
   tickers = extract_data_from_yaml('tickers')
 
   # extract data for funds
-  extracted_data = get_stock_prices(tickers)
+  if args.selenium:
+    extracted_data = get_stock_prices(tickers)
+  else:
+    extracted_data = get_stock_prices_pooled(tickers, args.browsers, args.pages_per_browser)
   print(extracted_data)
 
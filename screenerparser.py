@@ -0,0 +1,103 @@
+try:
+    import lxml.html as lxml_html
+except ImportError:  # lxml is optional; BeautifulSoup stays the fallback
+    lxml_html = None
+
+
+FIELDS = ['Market Cap', 'Current Price', 'Book Value', 'Face Value', 'Stock P/E', 'ROE', 'DMA 50', '3 Years', '5 Years', '10 Years', 'TTM']
+
+BACKENDS = ('lxml', 'bs4')
+DEFAULT_BACKEND = 'lxml' if lxml_html is not None else 'bs4'
+
+# XPath equivalents of the BeautifulSoup selectors used by _parse_bs4
+_TOP_RATIO_ITEMS = "//*[@id='top-ratios']//li"
+_RATIO_NAME = ".//span[contains(concat(' ', normalize-space(@class), ' '), ' name ')]"
+_RATIO_VALUE = ".//span[normalize-space(@class)='nowrap value']"
+_RATIO_NUMBER = ".//span[contains(concat(' ', normalize-space(@class), ' '), ' number ')]"
+_RANGES_TABLES = "//table[contains(concat(' ', normalize-space(@class), ' '), ' ranges-table ')]"
+
+
+def parse_screener_page(html, symbol=None, fields=FIELDS, backend=DEFAULT_BACKEND):
+    """
+    Extract the #top-ratios values and the 'Stock Price CAGR' ranges table from a
+    screener.in company page. Every backend yields the same dict.
+    """
+    extracted_data = {}
+    if symbol is not None:
+        extracted_data['ticker'] = symbol
+
+    if backend == 'lxml' and lxml_html is not None:
+        _parse_lxml(html, extracted_data, fields)
+    elif backend in BACKENDS:
+        _parse_bs4(html, extracted_data, fields)
+    else:
+        raise ValueError(f"Unsupported parser backend '{backend}'. Valid: {', '.join(BACKENDS)}")
+    return extracted_data
+
+
+def _ratio_value(number, value_text):
+    suffix = value_text.split(number, 1)[-1].strip()
+    return f"{number} {suffix}".strip()
+
+
+def _parse_bs4(html, extracted_data, fields):
+    # bs4 is only the fallback backend, so it is imported on first use
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Find all <li> tags under #top-ratios
+    for ratio in soup.select('#top-ratios li'):
+        name_tag = ratio.find('span', class_='name')
+        value_tag = ratio.find('span', class_='nowrap value')
+        if name_tag and value_tag:
+            name = name_tag.get_text(strip=True)
+            if name in fields:
+                number_tag = value_tag.find('span', class_='number')
+                number = number_tag.get_text(strip=True) if number_tag else ''
+                extracted_data[name] = _ratio_value(number, value_tag.get_text(strip=True))
+
+    for table in soup.select('table.ranges-table'):
+        header = table.find('th').text.strip()  # e.g. "Compounded Sales Growth, Stock Price CAGR ..."
+        if header == 'Stock Price CAGR':
+            for row in table.find_all('tr')[1:]:  # Skip the header row
+                cols = row.find_all('td')
+                if len(cols) == 2:
+                    label = cols[0].text.strip().replace(':', '')  # e.g. "5 Years"
+                    value = cols[1].text.strip()  # e.g. "10%"
+                    if label in fields:
+                        extracted_data[label] = value
+
+
+def _text(el):
+    return ''.join(el.itertext())
+
+
+def _stripped_text(el):
+    # BeautifulSoup's get_text(strip=True)
+    return ''.join(t.strip() for t in el.itertext())
+
+
+def _parse_lxml(html, extracted_data, fields):
+    root = lxml_html.fromstring(html)
+
+    for ratio in root.xpath(_TOP_RATIO_ITEMS):
+        name_tag = ratio.xpath(_RATIO_NAME)
+        value_tag = ratio.xpath(_RATIO_VALUE)
+        if name_tag and value_tag:
+            name = _stripped_text(name_tag[0])
+            if name in fields:
+                number_tag = value_tag[0].xpath(_RATIO_NUMBER)
+                number = _stripped_text(number_tag[0]) if number_tag else ''
+                extracted_data[name] = _ratio_value(number, _stripped_text(value_tag[0]))
+
+    for table in root.xpath(_RANGES_TABLES):
+        header = next(table.iter('th'))
+        if _text(header).strip() == 'Stock Price CAGR':
+            for row in list(table.iter('tr'))[1:]:
+                cols = list(row.iter('td'))
+                if len(cols) == 2:
+                    label = _text(cols[0]).strip().replace(':', '')
+                    value = _text(cols[1]).strip()
+                    if label in fields:
+                        extracted_data[label] = value
@@ -0,0 +1,121 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable
+
+from metrics import REGISTRY
+
+
+class Stage:
+    """One step of a pipeline: fn is called with the results of its deps as keyword arguments."""
+
+    __slots__ = ("name", "fn", "deps", "result", "started", "finished")
+
+    def __init__(self, name: str, fn: Callable[..., Any], deps: tuple[str, ...] = ()):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.result = None
+        self.started: float | None = None
+        self.finished: float | None = None
+
+    @property
+    def seconds(self) -> float:
+        return (self.finished or 0.0) - (self.started or 0.0)
+
+
+class StageGraph:
+    """
+    Runs stages in one process as soon as their dependencies finish, so
+    independent stages overlap on a thread pool and results are handed over in
+    memory. A failed stage stops its dependents; the stages already running are
+    waited for before the error is raised.
+    """
+
+    def __init__(self, stages: list[Stage]):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+        self._check_acyclic()
+        self.started: float | None = None
+        self.finished: float | None = None
+
+    def _check_acyclic(self) -> None:
+        done: set[str] = set()
+        remaining = dict(self.stages)
+        while remaining:
+            ready = [name for name, stage in remaining.items() if all(dep in done for dep in stage.deps)]
+            if not ready:
+                raise ValueError(f"Stage graph has a cycle through: {', '.join(sorted(remaining))}")
+            for name in ready:
+                done.add(name)
+                del remaining[name]
+
+    def _run_stage(self, stage: Stage) -> Any:
+        stage.started = time.perf_counter()
+        try:
+            with REGISTRY.stage(stage.name):
+                return stage.fn(**{dep: self.stages[dep].result for dep in stage.deps})
+        finally:
+            stage.finished = time.perf_counter()
+
+    def run(self) -> dict[str, Any]:
+        """Run every stage and return name -> result."""
+        self.started = time.perf_counter()
+        done: set[str] = set()
+        waiting = dict(self.stages)
+        running = {}
+        error = None
+        with ThreadPoolExecutor(max_workers=len(self.stages) or 1) as pool:
+            while waiting or running:
+                if error is None:
+                    for name in [n for n, s in waiting.items() if all(dep in done for dep in s.deps)]:
+                        running[pool.submit(self._run_stage, waiting.pop(name))] = name
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        self.stages[name].result = future.result()
+                        done.add(name)
+                    except BaseException as ex:  # SystemExit from a stage stops the graph the same way
+                        print(f"\033[91mStage '{name}' failed: {ex!r}\033[0m")
+                        error = error or ex
+        self.finished = time.perf_counter()
+        if error is not None:
+            raise error
+        return {name: stage.result for name, stage in self.stages.items()}
+
+    def critical_path(self) -> list[Stage]:
+        """
+        The chain of stages that decided the total run time: from the stage that
+        finished last, back through whichever dependency finished last each time.
+        """
+        ran = [s for s in self.stages.values() if s.finished is not None]
+        if not ran:
+            return []
+        stage = max(ran, key=lambda s: s.finished)
+        path = [stage]
+        while stage.deps:
+            stage = max((self.stages[d] for d in stage.deps), key=lambda s: s.finished or 0.0)
+            path.append(stage)
+        return path[::-1]
+
+    def report(self) -> str:
+        path = {stage.name for stage in self.critical_path()}
+        lines = [f"{'stage':<12} {'start s':>8} {'took s':>8}  critical path"]
+        for stage in sorted(self.stages.values(), key=lambda s: s.started if s.started is not None else float("inf")):
+            if stage.started is None:
+                lines.append(f"{stage.name:<12} {'-':>8} {'-':>8}  (not run)")
+                continue
+            marker = "*" if stage.name in path else ""
+            lines.append(f"{stage.name:<12} {stage.started - self.started:>8.2f} {stage.seconds:>8.2f}  {marker}")
+        busy = sum(s.seconds for s in self.stages.values() if s.finished is not None)
+        wall = (self.finished or time.perf_counter()) - self.started
+        lines.append(
+            f"Wall time {wall:.2f} s for {busy:.2f} s of stage work; critical path: "
+            + " -> ".join(stage.name for stage in self.critical_path())
+        )
+        return "\n".join(lines)
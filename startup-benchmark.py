@@ -0,0 +1,127 @@
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from stockscraper import COMMANDS
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CLI = os.path.join(SCRIPT_DIR, "stockscraper.py")
+
+# Third-party packages worth knowing about when one shows up in a subcommand's startup
+HEAVY_MODULES = ("aiohttp", "requests", "bs4", "lxml", "yaml", "openpyxl", "xlrd", "playwright")
+
+_IMPORTTIME = re.compile(r"^import time:\s+(\d+)\s+\|\s+\d+\s+\|\s*(\S+)")
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def _run(argv):
+    return subprocess.run([sys.executable, *argv], cwd=SCRIPT_DIR, capture_output=True, text=True)
+
+
+def heavy_imports(command):
+    """Packages from HEAVY_MODULES loaded by '<command> --help', with the ms spent importing each (submodules included)."""
+    out = _run(["-X", "importtime", CLI, command, "--help"])
+    loaded = {}
+    for line in out.stderr.splitlines():
+        m = _IMPORTTIME.match(line)
+        if not m:
+            continue
+        self_us, package = int(m.group(1)), m.group(2).split(".")[0]
+        if package in HEAVY_MODULES:
+            loaded[package] = loaded.get(package, 0.0) + self_us / 1000
+    return loaded
+
+
+def run_case(command, iterations, warmup):
+    """Wall time of a fresh 'python stockscraper.py <command> --help', i.e. import plus argument parsing."""
+    argv = [CLI, command, "--help"] if command else [CLI, "--help"]
+    for _ in range(warmup):
+        _run(argv)
+
+    latencies = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        out = _run(argv)
+        latencies.append(time.perf_counter() - t0)
+        if out.returncode != 0:
+            raise SystemExit(f"'{' '.join(argv[1:])}' failed:\n{out.stderr}")
+    latencies.sort()
+
+    return {
+        "iterations": iterations,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "min_ms": latencies[0] * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "heavy_imports_ms": heavy_imports(command) if command else {},
+    }
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPT_DIR,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(results, baseline=None):
+    print(f"{'command':<14} {'p50 ms':>9} {'min ms':>9} {'max ms':>9}   heavy imports (ms)")
+    for name, r in results.items():
+        heavy = ", ".join(f"{m} {ms:.0f}" for m, ms in sorted(r["heavy_imports_ms"].items(), key=lambda kv: -kv[1]))
+        line = f"{name:<14} {r['p50_ms']:>9.1f} {r['min_ms']:>9.1f} {r['max_ms']:>9.1f}   {heavy or '-'}"
+        prev = (baseline or {}).get(name)
+        if prev and prev.get("p50_ms"):
+            change = (r["p50_ms"] / prev["p50_ms"] - 1) * 100
+            line += f"   {change:+.1f}% p50 vs baseline"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start benchmark of each stockscraper subcommand (no network)")
+    parser.add_argument("--iterations", type=int, default=10, help="Timed interpreter starts per subcommand")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed starts per subcommand (warms the OS file cache)")
+    parser.add_argument("--command", action="append", default=[], choices=COMMANDS, help="Only run the named subcommand (repeatable)")
+    parser.add_argument("--out-dir", default=os.path.join(SCRIPT_DIR, "benchmark-results"), help="Directory for the JSON results file")
+    parser.add_argument("--compare", default=None, help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    # the bare CLI is the floor every subcommand starts from
+    results = {"(none)": run_case(None, args.iterations, args.warmup)}
+    for command in COMMANDS:
+        if args.command and command not in args.command:
+            continue
+        results[command] = run_case(command, args.iterations, args.warmup)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f).get("results")
+    print_report(results, baseline)
+
+    commit = _git_commit()
+    payload = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    os.makedirs(args.out_dir, exist_ok=True)
+    out_path = os.path.join(args.out_dir, f"startup_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}_{commit}.json")
+    with open(out_path, "w") as f:
+        json.dump(payload, f, indent=2)
+    print(f"✅ Results saved to: {out_path}")
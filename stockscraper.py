@@ -0,0 +1,64 @@
+import argparse
+import importlib
+import importlib.util
+import os
+import sys
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# subcommand -> (module or script implementing it, one-line help). Nothing here is
+# imported until its subcommand runs, so each one only pays for the backends it uses.
+COMMANDS = {
+    "scrape": ("advisor-parser-new.py", "Scrape advisorkhoj fund pages into the category CSV"),
+    "download": ("mftdownloader", "Download MFT XLS reports using cookies"),
+    "consolidate": ("mftreturnsconsolidator", "Join the MFT trailing-returns and risk-ratios reports"),
+    "augment": ("advisor-parser-secure.py", "Augment consolidated MFT returns with Groww P/E and P/B"),
+    "screener": ("screener-parser.py", "Scrape screener.in ratios for the tickers in tickers.yaml"),
+    "history": ("fundhistory", "Query or backfill the per-run fund history store"),
+}
+
+
+def load_script(filename):
+    """Import one of the hyphenated entry-point scripts next to this file as a module."""
+    name = os.path.splitext(filename)[0].replace("-", "_")
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SCRIPT_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    return module
+
+
+def load_command(command):
+    target = COMMANDS[command][0]
+    return load_script(target) if target.endswith(".py") else importlib.import_module(target)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="stockscraper",
+        description="Fund and stock scrapers behind one command",
+        epilog="Run 'stockscraper <command> --help' for the options of a command.",
+    )
+    parser.add_argument(
+        "command",
+        choices=COMMANDS,
+        metavar="command",
+        help="; ".join(f"{name}: {help_text}" for name, (_, help_text) in COMMANDS.items()),
+    )
+    parser.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    module = load_command(args.command)
+    sys.argv[0] = f"stockscraper {args.command}"
+    return module.main(args.args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import csv
+import os
+from typing import Any, Iterable
+
+from metrics import REGISTRY
+
+
+FORMATS = ("xlsx", "csv", "xls")
+DEFAULT_FORMAT = "xlsx"
+# Hard limits of the legacy BIFF8 .xls format written by xlwt
+XLS_MAX_ROWS = 65536
+XLS_MAX_COLS = 256
+
+
+def default_output_path(directory: str, stem: str, fmt: str | None = None) -> str:
+    """Output path used when none is given: stem.xlsx, or the extension of an explicit format."""
+    return os.path.join(directory, f"{stem}.{(fmt or DEFAULT_FORMAT).lower().lstrip('.')}")
+
+
+def format_for_path(path: str, fmt: str | None = None) -> str:
+    """Pick the output format from an explicit flag, else from the file extension."""
+    if fmt:
+        fmt = fmt.lower().lstrip(".")
+    else:
+        fmt = os.path.splitext(path)[1].lower().lstrip(".")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported output format '{fmt}'. Valid: {', '.join(FORMATS)}")
+    return fmt
+
+
+class TableWriter:
+    """Row-at-a-time table output; rows are handed to the backend as they arrive."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows_written = 0
+        self._recorded = False
+
+    def writerow(self, row: Iterable[Any]) -> None:
+        self._write(list(row))
+        self.rows_written += 1
+
+    def writerows(self, rows: Iterable[Iterable[Any]]) -> None:
+        for row in rows:
+            self.writerow(row)
+
+    def _write(self, row: list[Any]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> str:
+        if not self._recorded:
+            self._recorded = True
+            # the header row from open_table_writer is not a record
+            REGISTRY.records_written(os.path.basename(self.path), max(0, self.rows_written - 1))
+        return os.path.abspath(self.path)
+
+    def abort(self) -> None:
+        """Drop the rows written so far without saving the output file."""
+        self._recorded = True
+
+    def __enter__(self) -> "TableWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class CsvTableWriter(TableWriter):
+    def __init__(self, path: str, sheet_name: str):
+        super().__init__(path)
+        self._file = open(path, "w", newline="")
+        self._writer = csv.writer(self._file)
+
+    def _write(self, row: list[Any]) -> None:
+        self._writer.writerow(["" if v is None else v for v in row])
+
+    def close(self) -> str:
+        if not self._file.closed:
+            self._file.close()
+        return super().close()
+
+    def abort(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+            os.remove(self.path)
+        super().abort()
+
+
+class XlsxTableWriter(TableWriter):
+    def __init__(self, path: str, sheet_name: str):
+        from openpyxl import Workbook
+
+        super().__init__(path)
+        # write-only workbooks stream each appended row to a temp file instead of keeping cells
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet(sheet_name)
+        self._closed = False
+
+    def _write(self, row: list[Any]) -> None:
+        self._ws.append(row)
+
+    def close(self) -> str:
+        if not self._closed:
+            self._wb.save(self.path)
+            self._closed = True
+        return super().close()
+
+    def abort(self) -> None:
+        if not self._closed:
+            # finish the sheet's temp-file stream so it isn't torn down mid-element
+            self._ws.close()
+            self._closed = True
+        super().abort()
+
+
+class XlsTableWriter(TableWriter):
+    def __init__(self, path: str, sheet_name: str):
+        import xlwt
+
+        super().__init__(path)
+        self._wb = xlwt.Workbook()
+        self._ws = self._wb.add_sheet(sheet_name)
+        self._closed = False
+
+    def _write(self, row: list[Any]) -> None:
+        r = self.rows_written
+        if r >= XLS_MAX_ROWS or len(row) > XLS_MAX_COLS:
+            raise ValueError(
+                f"Legacy .xls output is limited to {XLS_MAX_ROWS} rows and {XLS_MAX_COLS} columns; "
+                "write .xlsx or .csv instead"
+            )
+        for c, val in enumerate(row):
+            self._ws.write(r, c, val if val is not None else "")
+        # flush finished rows so xlwt doesn't keep their cell objects around until save
+        if r and r % 1000 == 0:
+            self._ws.flush_row_data()
+
+    def close(self) -> str:
+        if not self._closed:
+            self._wb.save(self.path)
+            self._closed = True
+        return super().close()
+
+    def abort(self) -> None:
+        self._closed = True
+        super().abort()
+
+
+_WRITERS = {
+    "csv": CsvTableWriter,
+    "xlsx": XlsxTableWriter,
+    "xls": XlsTableWriter,
+}
+
+
+def open_table_writer(
+    path: str,
+    headers: list[str],
+    sheet_name: str = "Sheet1",
+    fmt: str | None = None,
+) -> TableWriter:
+    writer = _WRITERS[format_for_path(path, fmt)](path, sheet_name)
+    writer.writerow(headers)
+    return writer